@@ -0,0 +1,154 @@
+"""Reads and writes banks of sudoku puzzles in a compact binary format which can be memory mapped.
+
+A bank file starts with a 32 byte header, followed by one fixed size record for each puzzle.
+Each record holds the cells of the puzzle as one byte each, read row by row, followed by the
+cells of its solution if the bank stores solutions. A solution is only stored for a puzzle
+with exactly one solution, so a puzzle with a stored solution can be played without checking
+it, while a solution of all zeros means the puzzle has no solution or more than one. Since
+every cell is a whole byte, the puzzles and solutions in a bank can be read as numpy arrays
+which are views onto the file itself, with nothing parsed or loaded up front.
+
+Packing two cells into each byte would halve the size of a bank, but the cells would then
+have to be unpacked into a new array before use, so they couldn't be viewed without copying.
+It would also limit cells to the digits 0-15, which can't hold the digits of a 16x16 grid.
+"""
+
+import os
+import struct
+import numpy as np
+
+# The bytes every bank file starts with
+MAGIC = b"SDKBANK\0"
+
+# The version of the format written by BankWriter
+VERSION = 1
+
+# The magic bytes, version, side of each grid, flags and number of records, padded to 32 bytes
+HEADER = struct.Struct("<8sHHIQ8x")
+
+# Flag set when each record stores a solution after its puzzle
+HAS_SOLUTIONS = 1
+
+# The file extension used for banks
+BANK_EXTENSION = ".bank"
+
+def is_bank(path: str | os.PathLike) -> bool:
+    """Checks whether a file is a bank by reading its first few bytes."""
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+class PuzzleBank:
+    """A class that gives access to the puzzles and solutions in a bank file through memory mapped numpy arrays.
+
+    Attributes:
+        side (int): the side of each grid, which is 9 for standard sudokus.
+        puzzles (np.ndarray): (n, side, side) uint8 array of the puzzles, viewing the file directly.
+        solutions (np.ndarray | None): (n, side, side) uint8 array of the solutions, viewing the
+        file directly, or None if the bank doesn't store solutions.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        """Opens a bank file for reading.
+
+        Raises:
+            ValueError: if the file isn't a bank, or was written by a newer version of the format.
+        """
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+
+        if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{os.fspath(path)} is not a puzzle bank")
+
+        _, version, self.side, flags, count = HEADER.unpack(header)
+        if version > VERSION:
+            raise ValueError(f"puzzle bank version {version} is not supported, expected at most {VERSION}")
+
+        # Maps every record as an array of grids, where the first of each record is the puzzle
+        grids_per_record = 2 if flags & HAS_SOLUTIONS else 1
+        if count == 0:
+            records = np.zeros((0, grids_per_record, self.side, self.side), dtype=np.uint8)
+        else:
+            records = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER.size,
+                                shape=(count, grids_per_record, self.side, self.side))
+
+        self.puzzles = records[:, 0]
+        self.solutions = records[:, 1] if flags & HAS_SOLUTIONS else None
+
+    def __len__(self) -> int:
+        return len(self.puzzles)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.puzzles[index]
+
+    def __iter__(self):
+        return iter(self.puzzles)
+
+class BankWriter:
+    """A class that writes puzzles, and optionally their solutions, to a new bank file one at a time.
+
+    The number of records is written to the header when the writer is closed, so a bank can be
+    written from a stream of puzzles whose length isn't known in advance.
+    """
+
+    def __init__(self, path: str | os.PathLike, side: int = 9, solutions: bool = False) -> None:
+        """Creates a new bank file, replacing any existing file at the path.
+
+        Args:
+            path (str | os.PathLike): the path of the bank file.
+            side (int): the side of each grid, which is 9 for standard sudokus.
+            solutions (bool): whether a solution is written with each puzzle.
+        """
+        self.side = side
+        self.solutions = solutions
+        self.count = 0
+        self.file = open(path, "wb")
+        self.write_header()
+
+    def write_header(self) -> None:
+        """Writes the header for the records written so far to the start of the file."""
+        position = self.file.tell()
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.side, HAS_SOLUTIONS if self.solutions else 0, self.count))
+        if position > 0:
+            self.file.seek(position)
+
+    def write(self, puzzle: np.ndarray, solution: np.ndarray | None = None) -> None:
+        """Writes a puzzle, and its solution if the bank stores solutions.
+
+        Args:
+            puzzle (np.ndarray): numpy array representing the sudoku grid, where empty cells are stored as 0.
+            solution (np.ndarray | None): numpy array containing the unique solution to the puzzle, where a
+            solution with all entries as -1, or None, is written as all zeros to show that there is no unique solution.
+
+        Raises:
+            ValueError: if the grids are the wrong size for the bank, or a solution is given to a bank without solutions.
+        """
+        if puzzle.shape != (self.side, self.side):
+            raise ValueError(f"puzzle must be a {self.side}x{self.side} grid to be written to this bank")
+        if not self.solutions and solution is not None:
+            raise ValueError("solutions can't be written to a bank without solutions")
+        if solution is not None and solution.shape != puzzle.shape:
+            raise ValueError(f"solution must be a {self.side}x{self.side} grid to be written to this bank")
+
+        self.file.write(puzzle.astype(np.uint8).tobytes())
+
+        # Writes a grid of zeros in place of a missing solution
+        if self.solutions:
+            if solution is None or (solution < 0).any():
+                solution = np.zeros_like(puzzle)
+            self.file.write(solution.astype(np.uint8).tobytes())
+
+        self.count += 1
+
+    def close(self) -> None:
+        """Writes the final number of records to the header and closes the file."""
+        if self.file.closed:
+            return
+        self.write_header()
+        self.file.close()
+
+    def __enter__(self) -> 'BankWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,166 @@
+"""Benchmarks solving, counting and generating sudokus, reporting throughput, latency and peak memory."""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+from typing import Callable
+from generator import SudokuGenerator
+from solver import SudokuSolver
+
+# The directory containing the bundled puzzle sets, which each have one sudoku string per line
+PUZZLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puzzles")
+
+# The bundled puzzle sets, from puzzles that can be solved with singles alone to some of the hardest known puzzles
+PUZZLE_SETS = ["easy", "hard", "17-clue"]
+
+# The operations that can be benchmarked, where the first two run on every puzzle set and engine
+BENCHMARKS = ["solve", "count", "solution", "puzzle"]
+
+def load_puzzles(name: str) -> list[np.ndarray]:
+    """Loads a bundled puzzle set by name."""
+    with open(os.path.join(PUZZLES_DIR, f"{name}.txt")) as file:
+        return [SudokuSolver.from_string(line.strip()) for line in file if line.strip()]
+
+def measure(prepare: Callable[[int], tuple], task: Callable, n: int, repeats: int) -> tuple[dict, list]:
+    """Measures a task run on each of n items, where the arguments for each item are prepared outside of the timing.
+
+    Every item is timed repeats times, and then run once more with memory tracing enabled
+    to find the peak memory used, since tracing slows down every allocation.
+
+    Args:
+        prepare (Callable[[int], tuple]): a function giving the arguments of the task for an item index.
+        task (Callable): the function to benchmark.
+        n (int): the number of items.
+        repeats (int): the number of times each item is timed.
+
+    Returns:
+        tuple[dict, list]: the measurements, and the result of the task for each item.
+    """
+    latencies = []
+    for _ in range(repeats):
+        for i in range(n):
+            args = prepare(i)
+            start_time = time.perf_counter()
+            task(*args)
+            latencies.append(time.perf_counter() - start_time)
+
+    # Finds the largest peak of any single item while tracing memory allocations
+    peak_memory = 0
+    outputs = []
+    tracemalloc.start()
+    for i in range(n):
+        args = prepare(i)
+        tracemalloc.reset_peak()
+        outputs.append(task(*args))
+        peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    measurements = {
+        "runs": len(latencies),
+        "throughput": len(latencies) / sum(latencies),
+        "mean_ms": 1000 * float(np.mean(latencies)),
+        "p50_ms": 1000 * float(np.percentile(latencies, 50)),
+        "p99_ms": 1000 * float(np.percentile(latencies, 99)),
+        "peak_memory_kib": peak_memory / 1024,
+    }
+    return measurements, outputs
+
+def run_benchmarks(benchmarks: list[str], sets: list[str], engines: list[str],
+                   count: int, seed: int, repeats: int) -> list[dict]:
+    """Runs every chosen benchmark, returning a list of results which each name the benchmark,
+    puzzle set and engine alongside their measurements.
+
+    Solving and counting are run on every puzzle set with every engine, checking that all of
+    the engines agree, while generation is run for count sequential indices of the seed.
+    Every random number generator is seeded, so the same work is done on every run.
+    """
+    results = []
+
+    for benchmark in [benchmark for benchmark in benchmarks if benchmark in ("solve", "count")]:
+        for name in sets:
+            puzzles = load_puzzles(name)
+            outputs = {}
+            for engine in engines:
+                if benchmark == "solve":
+                    prepare = lambda i: (puzzles[i].copy(), engine, np.random.default_rng([seed, i]))
+                    task = SudokuSolver.solve
+                else:
+                    prepare = lambda i: (puzzles[i], 2, engine)
+                    task = SudokuSolver.count_solutions
+
+                measurements, outputs[engine] = measure(prepare, task, len(puzzles), repeats)
+                results.append({"benchmark": benchmark, "set": name, "engine": engine, **measurements})
+
+            # Ensures every engine agrees on every puzzle
+            outputs = [[SudokuSolver.to_string(output) if benchmark == "solve" else output for output in outputs[engine]]
+                       for engine in engines]
+            if any(output != outputs[0] for output in outputs):
+                raise RuntimeError(f"engines gave different results for the {name} set when running {benchmark}")
+
+    # Generation doesn't depend on the solving engine, and uses a sequence of puzzle seeds instead of a set
+    generators = {"solution": SudokuGenerator.generate_solution, "puzzle": SudokuGenerator.generate_puzzle}
+    for benchmark in [benchmark for benchmark in benchmarks if benchmark in generators]:
+        prepare = lambda i: (None, SudokuGenerator.puzzle_rng(seed, i))
+        measurements, _ = measure(prepare, generators[benchmark], count, repeats)
+        results.append({"benchmark": benchmark, "set": None, "engine": None, **measurements})
+
+    return results
+
+def print_results(results: list[dict], file=None) -> None:
+    """Prints a table of benchmark results."""
+    print(f"{'benchmark':<10}{'set':<9}{'engine':<10}{'runs':>6}{'ops/s':>11}{'p50':>11}{'p99':>11}{'peak':>12}", file=file)
+    for result in results:
+        print(f"{result['benchmark']:<10}{result['set'] or '-':<9}{result['engine'] or '-':<10}{result['runs']:>6}"
+              f"{result['throughput']:>11.1f}{result['p50_ms']:>9.2f}ms{result['p99_ms']:>9.2f}ms"
+              f"{result['peak_memory_kib']:>9.1f}KiB", file=file)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    # Adds command line arguments to be parsed
+    parser.add_argument("-b", "--benchmarks", nargs="+", choices=BENCHMARKS, default=BENCHMARKS,
+        help="the operations to benchmark")
+    parser.add_argument("-p", "--puzzle-sets", nargs="+", choices=PUZZLE_SETS, default=PUZZLE_SETS,
+        help="the bundled puzzle sets to solve and count")
+    parser.add_argument("-e", "--engines", nargs="+", choices=SudokuSolver.ENGINES, default=list(SudokuSolver.ENGINES),
+        help="the solving engines to compare")
+    parser.add_argument("-n", "--count", type=int, default=10,
+        help="the number of solutions and puzzles to generate")
+    parser.add_argument("-s", "--seed", type=int, default=0,
+        help="the seed for every random number generator used")
+    parser.add_argument("-r", "--repeats", type=int, default=3,
+        help="the number of times each puzzle is solved or generated")
+    parser.add_argument("-o", "--output", default=None,
+        help="file to write the results to as JSON, for comparing between versions")
+
+    # Parses the command line arguments
+    args = parser.parse_args()
+
+    if args.count < 1:
+        parser.error("the number of puzzles to generate must be at least 1")
+    if args.repeats < 1:
+        parser.error("the number of repeats must be at least 1")
+    if args.seed < 0:
+        parser.error("the seed must be at least 0")
+
+    results = run_benchmarks(args.benchmarks, args.puzzle_sets, args.engines, args.count, args.seed, args.repeats)
+    print_results(results)
+
+    # Writes the results along with the settings and environment they were measured in
+    if args.output is not None:
+        report = {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "count": args.count,
+            "results": results,
+        }
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
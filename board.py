@@ -1,7 +1,6 @@
 """A board object to allow interactions with a sudoku puzzle stored as a numpy array."""
 
 import pygame
-import copy
 import numpy as np
 from solver import SudokuSolver
 
@@ -53,8 +52,9 @@ class SudokuBoard:
         # Calculates the total size of the board
         self.size = 9 * (cell_size + 2)
 
-        # Renders and stores the board background surface
+        # Renders and stores the board background surface, and the surface the board is drawn to between frames
         self.board = self.render_board()
+        self.surface = pygame.Surface((self.size, self.size))
 
         # Creates an array containing the rects for filling each cell
         self.cell_rects = np.zeros((9, 9, 4), dtype=int)
@@ -67,8 +67,13 @@ class SudokuBoard:
         self.connected = set()
         self.incorrect = set()
 
-        # Stack to store all moves made on the sudoku
+        # Stacks to store all moves made on the sudoku, and moves which have been undone and can be redone
         self.moves = []
+        self.undone = []
+
+        # Cells that have changed since the board was last drawn, and whether the whole board must be drawn
+        self.dirty = set()
+        self.redraw_all = True
 
     def render_board(self) -> pygame.Surface:
         surface = pygame.Surface((self.size, self.size))
@@ -149,15 +154,21 @@ class SudokuBoard:
         # Calculates and returns the row and column index of the position
         return bx * 3 + cx, by * 3 + cy
 
-    def set_sudoku(self, sudoku: np.ndarray) -> bool:
-        """Sets the sudoku puzzle to render on the board."""
-        # Checks that the sudoku is valid and possible
-        if SudokuSolver.count_solutions(sudoku, 2) != 1:
-            return False
+    def set_sudoku(self, sudoku: np.ndarray, solution: np.ndarray | None = None) -> bool:
+        """Sets the sudoku puzzle to render on the board.
+
+        If the solution is already known it can be given, in which case the puzzle
+        is trusted to have only that solution and isn't checked or solved again.
+        """
+        # Checks that the sudoku is valid and possible, and finds its solution in the same search if it isn't given
+        if solution is None:
+            count, solution = SudokuSolver.analyse(sudoku)
+            if count != 1:
+                return False
 
         # Sets the sudoku and stores its solution
         self.sudoku = sudoku
-        self.solution = SudokuSolver.solve(sudoku.copy())
+        self.solution = solution
 
         # Creates a mask of the locked cells on the sudoku grid
         self.locked = (sudoku > 0).astype(bool)
@@ -166,15 +177,23 @@ class SudokuBoard:
         self.hovering = None
         self.selected = None
         self.connected = set()
-        self.incorrect = set()
 
-        # Resets moves stack
+        # Finds the incorrect cells and counts the filled cells, which are then kept up to date as each cell changes
+        self.incorrect = self.calculate_incorrect()
+        self.filled = int(np.count_nonzero(sudoku))
+
+        # Resets moves stacks
         self.moves = []
+        self.undone = []
+
+        # Draws the whole board on the next frame
+        self.redraw_all = True
         return True
 
     def check_solution(self) -> bool:
-        """Checks whether the current state of the sudoku matches the solution."""
-        return (self.sudoku == self.solution).all()
+        """Checks whether the current state of the sudoku matches the solution, which
+        is the case when every cell is filled and none of them are incorrect."""
+        return self.filled == self.sudoku.size and not self.incorrect
     
     def check_valid(self, pos: tuple[int, int]) -> bool:
         """Checks whether a given position in the sudoku is currently correct."""
@@ -183,17 +202,48 @@ class SudokuBoard:
     def calculate_incorrect(self) -> set[tuple]:
         """Calculates the positions of all incorrect cells in the sudoku."""
         condition = np.logical_and(self.sudoku != self.solution, self.sudoku != 0)
-        return [(x, y) for y, x in zip(*np.where(condition))]
+        return {(x, y) for y, x in zip(*np.where(condition))}
 
-    def clear(self) -> None:
-        """Clears the current sudoku puzzle, resetting it to its starting value."""
-        # Stores the 'clear' move on the stack and reverts the board to only contain locked values
-        self.moves.append((1, copy.copy(self.sudoku)))
-        self.sudoku[np.logical_not(self.locked)] = 0
+    def mark_dirty(self, positions) -> None:
+        """Marks the cells at the given positions to be redrawn the next time the board is drawn, ignoring None."""
+        self.dirty.update(pos for pos in positions if pos is not None)
 
-        # Recalculates incorrect cells
-        self.incorrect = self.calculate_incorrect()
+    def set_cell(self, si: tuple[int, int], value: int) -> None:
+        """Sets the value of the cell at the given index of the sudoku, updating the count
+        of filled cells and whether the cell is incorrect, and marking it to be redrawn."""
+        pos = (si[1], si[0])
+        self.filled += int(value != 0) - int(self.sudoku[si] != 0)
+        self.sudoku[si] = value
 
+        if value != 0 and value != self.solution[si]:
+            self.incorrect.add(pos)
+        else:
+            self.incorrect.discard(pos)
+
+        self.mark_dirty([pos])
+
+    def make_move(self, changes: tuple[tuple]) -> None:
+        """Makes a move and stores it on the moves stack so that it can be undone.
+
+        Args:
+            changes (tuple[tuple]): the changes made by the move, where each is a tuple of the
+            index of a cell in the sudoku, its value before the move and its value after.
+        """
+        if not changes:
+            return
+
+        for si, _, value in changes:
+            self.set_cell(si, value)
+
+        # A new move replaces any moves that could have been redone
+        self.moves.append(changes)
+        self.undone = []
+
+    def clear(self) -> None:
+        """Clears the current sudoku puzzle, resetting it to its starting value."""
+        # Reverts the board to only contain locked values, storing the cells that are cleared as one move
+        rows, cols = np.nonzero(np.logical_and(np.logical_not(self.locked), self.sudoku != 0))
+        self.make_move(tuple(((row, col), int(self.sudoku[row, col]), 0) for row, col in zip(rows.tolist(), cols.tolist())))
 
     def undo(self) -> None:
         """Undoes actions in the reverse order to which they were taken."""
@@ -201,18 +251,23 @@ class SudokuBoard:
         if len(self.moves) == 0:
             return
         
-        # Pops the last move off the stack
-        last_move = self.moves.pop()
-
-        if last_move[0] == 0:
-            # Undoes regular set/remove moves
-            self.sudoku[last_move[1]] = last_move[2]
-        else:
-            # Undoes the 'clear' move, resetting the entire board
-            self.sudoku[:, :] = last_move[1]
+        # Pops the last move off the stack and restores the previous value of each cell it changed
+        changes = self.moves.pop()
+        for si, value, _ in changes:
+            self.set_cell(si, value)
+        self.undone.append(changes)
+
+    def redo(self) -> None:
+        """Redoes undone actions in the reverse order to which they were undone."""
+        # Ensures no error is caused by attempting to redo a move that doesn't exist
+        if len(self.undone) == 0:
+            return
 
-        # Recalculates incorrect cells
-        self.incorrect = self.calculate_incorrect()
+        # Pops the last undone move off the stack and makes its changes again
+        changes = self.undone.pop()
+        for si, _, value in changes:
+            self.set_cell(si, value)
+        self.moves.append(changes)
         
     def calculate_connected(self, pos: tuple[int, int]) -> set[tuple]:
         """Calculates the positions of all cells connected to a given cell."""
@@ -240,15 +295,21 @@ class SudokuBoard:
 
     def select(self, pos: tuple[int, int]) -> None:
         """Selects the cell at the given surface position."""
+        self.mark_dirty([self.selected, *self.connected])
         self.selected = self.convert_surface_pos(pos) if pos else None
         self.connected = self.calculate_connected(self.selected)
+        self.mark_dirty(self.connected)
 
     def hover(self, pos: tuple[int, int]) -> None:
         """Hovers the cell at the given surface position."""
-        self.hovering = self.convert_surface_pos(pos) if pos else None
+        hovering = self.convert_surface_pos(pos) if pos else None
+        if hovering != self.hovering:
+            self.mark_dirty([self.hovering, hovering])
+            self.hovering = hovering
 
     def deselect_all(self) -> None:
         """Deselects the currently selected cell and removes its connected cells."""
+        self.mark_dirty([self.selected, self.hovering, *self.connected])
         self.selected = None
         self.hovering = None
         self.connected = set()
@@ -258,11 +319,7 @@ class SudokuBoard:
         # Sets the cell's value to 0 in the sudoku
         si = (self.selected[1], self.selected[0])
         if self.selected is not None and not self.locked[si]:
-            self.moves.append((0, si, self.sudoku[si]))
-            self.sudoku[si] = 0
-
-            # Recalculates incorrect cells
-            self.incorrect = self.calculate_incorrect()
+            self.make_move(((si, int(self.sudoku[si]), 0),))
     
     def set_selected_cell(self, i: int) -> bool:
         """Sets the currently selected cell to a given value if it isn't locked."""
@@ -273,11 +330,7 @@ class SudokuBoard:
         # Sets the cell's value to the given integer in the sudoku
         si = (self.selected[1], self.selected[0])
         if self.selected is not None and not self.locked[si]:
-            self.moves.append((0, si, self.sudoku[si]))
-            self.sudoku[si] = i
-
-            # Recalculates incorrect cells
-            self.incorrect = self.calculate_incorrect()
+            self.make_move(((si, int(self.sudoku[si]), i),))
 
             # Checks if the move was valid
             if not self.check_valid(si):
@@ -295,20 +348,39 @@ class SudokuBoard:
         x, y = self.selected[0] + movement[0], self.selected[1] + movement[1]
 
         # Clips values to be within the grid and sets it to be the new selected cell
+        self.mark_dirty([self.selected, *self.connected])
         self.selected = tuple(np.clip((x, y), 0, 8))
         self.connected = self.calculate_connected(self.selected)
+        self.mark_dirty(self.connected)
 
 
-    def draw(self, surface: pygame.Surface) -> None:
-        """Draws a sudoku to the given surface at a specified position.
-        
+    def draw(self, surface: pygame.Surface) -> list[pygame.Rect]:
+        """Draws the board to the given surface at the board's position, only redrawing
+        the cells that have changed since it was last drawn.
+
         Args:
-            sudoku (np.ndarray): the sudoku to be drawn.
-            pos (tuple[int, int]): the position at which the board will be displayed.
             surface (pygame.Surface): the surface on which the board will be drawn.
+
+        Returns:
+            list[pygame.Rect]: the areas of the surface that were drawn to, which are
+            the only parts of the display that need to be updated.
         """
-        surface.fill(self.colours["background"])
-        surface.blit(self.render(), self.pos)
+        # Draws the background and the whole board when the sudoku has been set
+        if self.redraw_all:
+            self.redraw_all = False
+            self.dirty.clear()
+            surface.fill(self.colours["background"])
+            surface.blit(self.render(), self.pos)
+            return [surface.get_rect()]
+
+        # Otherwise only the changed cells are redrawn and copied to the surface
+        rects = []
+        for pos in self.dirty:
+            self.render_cell(pos)
+            rect = pygame.Rect(self.cell_rects[pos].tolist())
+            rects.append(surface.blit(self.surface, rect.move(self.pos), rect))
+        self.dirty.clear()
+        return rects
 
     def centre(self, row, col, surface: pygame.Surface):
         """Centres a surface in the cell at the given row and column indices."""
@@ -316,33 +388,33 @@ class SudokuBoard:
         ccol = self.cell_rects[row, col, 0] + (self.cell_size - surface.get_height()) / 2
         return (crow, ccol)
 
-    def render(self) -> pygame.Surface: 
-        """Creates a surface containing the board which shows the given sudoku."""
-        surface = pygame.Surface((self.size, self.size))
-        
-        # Draws the empty board onto the surface
-        surface.blit(self.board, (0, 0))
+    def render_cell(self, pos: tuple[int, int]) -> None:
+        """Redraws the cell at the given position onto the board's surface, coloured by its current state."""
+        # Finds the colour of the cell, where incorrect cells take priority over selected, hovered and connected cells
+        if pos in self.incorrect:
+            colour = self.colours["incorrect"]
+        elif pos == self.selected:
+            colour = self.colours["selected"]
+        elif pos == self.hovering:
+            colour = self.colours["hovering"]
+        elif pos in self.connected:
+            colour = self.colours["connected"]
+        else:
+            colour = self.colours["default"]
+        pygame.draw.rect(self.surface, colour, self.cell_rects[pos])
 
-        # Fills in connected cells
-        for pos in self.connected:
-            pygame.draw.rect(surface, self.colours["connected"], self.cell_rects[pos])
+        # Draws the cell's digit over its colour
+        digit = self.text_surfaces[self.sudoku[pos[1], pos[0]]]
+        self.surface.blit(digit, self.centre(pos[1], pos[0], digit))
 
-        # Fills in the cell that's being hovered over
-        if self.hovering is not None:
-            pygame.draw.rect(surface, self.colours["hovering"], self.cell_rects[self.hovering])
-        
-        # Fills in selected cells
-        if self.selected is not None:
-            pygame.draw.rect(surface, self.colours["selected"], self.cell_rects[self.selected])
+    def render(self) -> pygame.Surface: 
+        """Redraws every cell of the board onto the board's surface, which is kept between frames, and returns it."""
+        # Draws the empty board onto the surface
+        self.surface.blit(self.board, (0, 0))
 
-        # Fills in incorrect cells
-        for pos in self.incorrect:
-            pygame.draw.rect(surface, self.colours["incorrect"], self.cell_rects[pos])
-        
-        # Draws text surfaces to the grid
+        # Draws each cell in its colour along with its digit
         for row in range(9):
             for col in range(9):
-                digit = self.text_surfaces[self.sudoku[row, col]]
-                surface.blit(digit, self.centre(row, col, digit))
-        
-        return surface
\ No newline at end of file
+                self.render_cell((col, row))
+
+        return self.surface
@@ -0,0 +1,200 @@
+"""Caches sudoku solutions under a canonical form shared by all equivalent puzzles."""
+
+import itertools
+import math
+import numpy as np
+from collections import OrderedDict, namedtuple
+
+# The largest number of rearrangements that will be compared to find a canonical form, where each costs
+# around 3.5 microseconds, so that finding a canonical form takes at most about 1ms and is cheaper than solving
+MAX_CANDIDATES = 256
+
+# Statistics describing the use of a solution cache, matching the fields of functools.lru_cache
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+class CanonicalForm:
+    """A class that represents the transformation of a sudoku into the canonical form of its equivalence class.
+
+    Two sudokus are equivalent if one can be turned into the other by relabelling the digits,
+    permuting the bands, the rows within a band, the stacks, or the columns within a stack,
+    and transposing the grid. Equivalent sudokus have the same canonical key, and the solution
+    of one can be mapped onto the others through their canonical forms.
+    """
+
+    def __init__(self, key: tuple, transposed: bool, rows: np.ndarray, cols: np.ndarray, labels: np.ndarray) -> None:
+        """Creates a canonical form from the rearrangement which maps a sudoku onto it.
+
+        Args:
+            key (tuple): the key shared by every equivalent sudoku.
+            transposed (bool): whether the sudoku is transposed before being rearranged.
+            rows (np.ndarray): the row of the sudoku that is moved to each row of the canonical form.
+            cols (np.ndarray): the column of the sudoku that is moved to each column of the canonical form.
+            labels (np.ndarray): the canonical label given to each digit, where 0 always maps to 0.
+        """
+        self.key = key
+        self.transposed = transposed
+        self.rows = rows
+        self.cols = cols
+        self.labels = labels
+        self.inverse_labels = np.argsort(labels)
+
+    @staticmethod
+    def identity(sudoku: np.ndarray) -> 'CanonicalForm':
+        """Creates a form which leaves the sudoku unchanged, keyed by the sudoku itself."""
+        return CanonicalForm(("exact", sudoku.astype(np.uint8).tobytes()), False, np.arange(9), np.arange(9), np.arange(10))
+
+    def to_canonical(self, sudoku: np.ndarray) -> np.ndarray:
+        """Maps a grid onto the canonical form."""
+        grid = sudoku.T if self.transposed else sudoku
+        return self.labels[grid[np.ix_(self.rows, self.cols)]]
+
+    def from_canonical(self, canonical: np.ndarray) -> np.ndarray:
+        """Maps a grid in the canonical form back onto the original sudoku."""
+        grid = np.zeros((9, 9), dtype=int)
+        grid[np.ix_(self.rows, self.cols)] = self.inverse_labels[canonical]
+        return grid.T if self.transposed else grid
+
+def line_keys(clues: np.ndarray) -> list[tuple]:
+    """Calculates a key for each row of a grid which doesn't change under any symmetry that keeps the row a row."""
+    row_counts, col_counts = clues.sum(axis=1), clues.sum(axis=0)
+    return [(int(row_counts[row]), tuple(sorted(col_counts[clues[row]].tolist()))) for row in range(9)]
+
+def tied_orders(keys: list) -> list[tuple[int, ...]]:
+    """Finds every ordering of some items which sorts them by their keys, permuting items with equal keys."""
+    ranked = sorted(range(len(keys)), key=lambda i: keys[i])
+    groups = [list(group) for _, group in itertools.groupby(ranked, key=lambda i: keys[i])]
+    return [sum(orders, ()) for orders in itertools.product(*(itertools.permutations(group) for group in groups))]
+
+def count_tied_orders(keys: list) -> int:
+    """Counts the number of orderings that tied_orders would find, without creating them."""
+    return math.prod(math.factorial(len(list(group))) for _, group in itertools.groupby(sorted(keys)))
+
+def count_line_permutations(keys: list[tuple]) -> int:
+    """Counts the number of permutations that line_permutations would find, without creating them."""
+    band_keys = [tuple(sorted(keys[3 * band:3 * band + 3])) for band in range(3)]
+    return count_tied_orders(band_keys) * math.prod(count_tied_orders(keys[3 * band:3 * band + 3]) for band in range(3))
+
+def line_permutations(keys: list[tuple]) -> np.ndarray:
+    """Finds every permutation of the rows of a grid which sorts its bands, and the rows within each band, by their keys.
+
+    Returns:
+        np.ndarray: array containing a row permutation on each row.
+    """
+    band_keys = [tuple(sorted(keys[3 * band:3 * band + 3])) for band in range(3)]
+    row_keys = [keys[3 * band:3 * band + 3] for band in range(3)]
+
+    # Combines every ordering of the bands with every ordering of the rows within them
+    row_orders = [tied_orders(keys) for keys in row_keys]
+    return np.array([
+        [3 * band + row for band in band_order for row in rows[band]]
+        for band_order in tied_orders(band_keys)
+        for rows in itertools.product(*row_orders)
+    ])
+
+def canonical_form(sudoku: np.ndarray) -> CanonicalForm:
+    """Finds the canonical form of a sudoku.
+
+    The canonical form is the lexicographically smallest grid, after relabelling the digits in order
+    of first appearance, among the rearrangements which sort the bands, rows, stacks and columns by
+    keys based on where the clues are. Since these keys are unchanged by relabelling and permuting,
+    only rearrangements between lines with equal keys need to be compared. If there are too
+    many such rearrangements, the sudoku is keyed by itself instead.
+
+    Args:
+        sudoku (np.ndarray): 9x9 numpy array representing the sudoku grid.
+        Empty cells are stored as 0.
+
+    Returns:
+        CanonicalForm: the canonical form of the sudoku.
+    """
+    clues = sudoku > 0
+    row_keys, col_keys = line_keys(clues), line_keys(clues.T)
+
+    # Chooses the orientations whose bands and stacks have the smallest keys
+    signature = (sorted(row_keys), sorted(col_keys))
+    transposed_signature = (signature[1], signature[0])
+    orientations = [(False, row_keys, col_keys), (True, col_keys, row_keys)]
+    if signature != transposed_signature:
+        orientations = [orientations[signature > transposed_signature]]
+
+    # Ensures the number of candidate rearrangements is small enough to compare
+    candidates_n = sum(count_line_permutations(keys_for_rows) * count_line_permutations(keys_for_cols)
+                       for _, keys_for_rows, keys_for_cols in orientations)
+    if candidates_n > MAX_CANDIDATES:
+        return CanonicalForm.identity(sudoku)
+
+    best = None
+    for transposed, keys_for_rows, keys_for_cols in orientations:
+        rows, cols = line_permutations(keys_for_rows), line_permutations(keys_for_cols)
+        grid = sudoku.T if transposed else sudoku
+        rearranged = grid[rows[:, None, :, None], cols[None, :, None, :]].reshape((-1, 81))
+
+        # Relabels the digits of each rearrangement in order of their first appearance
+        present = rearranged[:, :, None] == np.arange(1, 10)
+        first = np.where(present.any(axis=1), present.argmax(axis=1), 81)
+        order = np.argsort(first, axis=1, kind="stable")
+        labels = np.zeros((len(rearranged), 10), dtype=int)
+        np.put_along_axis(labels, order + 1, np.arange(1, 10), axis=1)
+        relabelled = np.take_along_axis(labels, rearranged, axis=1).astype(np.uint8)
+
+        # Finds the lexicographically smallest rearrangement
+        keys = relabelled.view(np.dtype((np.bytes_, 81))).reshape(-1)
+        i = keys.argmin()
+        if best is None or keys[i] < best[0]:
+            best = (keys[i], transposed, rows[i // len(cols)], cols[i % len(cols)], labels[i])
+
+    key, transposed, rows, cols, labels = best
+    return CanonicalForm(("canonical", key), transposed, rows, cols, labels)
+
+class SolutionCache:
+    """A class that stores the solutions of recently solved sudokus, evicting the least recently used.
+
+    Solutions are stored under the canonical form of their sudoku, so a solution can be
+    reused for any sudoku which is equivalent to one that has already been solved.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        """Creates an empty cache which holds at most maxsize solutions."""
+        self.maxsize = maxsize
+        self.solutions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, sudoku: np.ndarray) -> tuple[CanonicalForm, np.ndarray | None]:
+        """Looks up the solution to a sudoku.
+
+        Returns:
+            tuple[CanonicalForm, np.ndarray | None]: the canonical form of the sudoku, which can be
+            passed to store, and its solution if it was cached. If the sudoku is known to have
+            no solution, the returned solution has all entries as -1.
+        """
+        form = canonical_form(sudoku)
+        if form.key not in self.solutions:
+            self.misses += 1
+            return form, None
+
+        # Marks the solution as the most recently used
+        self.hits += 1
+        self.solutions.move_to_end(form.key)
+        solution = self.solutions[form.key]
+        return form, np.full((9, 9), -1) if solution is None else form.from_canonical(solution)
+
+    def store(self, form: CanonicalForm, solution: np.ndarray) -> None:
+        """Stores the solution to a sudoku with a given canonical form, where a
+        solution with all entries as -1 represents a sudoku with no solution."""
+        self.solutions[form.key] = None if (solution < 0).any() else form.to_canonical(solution)
+        self.solutions.move_to_end(form.key)
+
+        # Evicts the least recently used solutions once the cache is full
+        while len(self.solutions) > self.maxsize:
+            self.solutions.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        """Gets statistics about the use of the cache."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.solutions))
+
+    def clear(self) -> None:
+        """Removes every solution from the cache and resets its statistics."""
+        self.solutions.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,366 @@
+"""Solves sudoku puzzles by propagating the candidates of each cell as bitmasks."""
+
+import functools
+import math
+import numpy as np
+from collections import namedtuple
+
+# Values returned by propagate when the grid is contradictory or complete
+CONTRADICTION = -2
+SOLVED = -1
+
+# The largest grid side for which the bits of every candidate bitmask are precomputed
+MASK_BITS_MAX_SIDE = 9
+
+# Lookup tables describing the layout of a grid with a given box size
+GridTables = namedtuple("GridTables", [
+    "box", "side", "cells", "all_digits", "cell_rows", "cell_cols", "cell_blocks", "units", "cell_peers", "mask_bits"])
+
+@functools.cache
+def grid_tables(box: int) -> GridTables:
+    """Builds the lookup tables for a grid made of box x box blocks, which has a side of box * box cells.
+
+    The tables are only built once for each box size, so that every table for the same size of grid shares them.
+    """
+    side = box * box
+    cells = side * side
+
+    # Bitmask containing every digit, where bit n - 1 represents the digit n
+    all_digits = (1 << side) - 1
+
+    # The row, column and block of each cell in the flattened grid
+    cell_rows = [i // side for i in range(cells)]
+    cell_cols = [i % side for i in range(cells)]
+    cell_blocks = [(i // (side * box)) * box + (i % side) // box for i in range(cells)]
+
+    # The cells in each of the rows, columns and blocks of the grid
+    units = (
+        [[row * side + col for col in range(side)] for row in range(side)]
+        + [[row * side + col for row in range(side)] for col in range(side)]
+        + [[i for i in range(cells) if cell_blocks[i] == block] for block in range(side)]
+    )
+
+    # The other cells sharing a row, column or block with each cell
+    cell_peers = [
+        sorted({j for unit in (units[cell_rows[i]], units[side + cell_cols[i]], units[2 * side + cell_blocks[i]])
+                for j in unit} - {i})
+        for i in range(cells)
+    ]
+
+    # The individual bits of every possible candidate bitmask, which is only feasible for small grids
+    mask_bits = None
+    if side <= MASK_BITS_MAX_SIDE:
+        mask_bits = [[1 << n for n in range(side) if mask >> n & 1] for mask in range(all_digits + 1)]
+
+    return GridTables(box, side, cells, all_digits, cell_rows, cell_cols, cell_blocks, units, cell_peers, mask_bits)
+
+def split_bits(mask: int) -> list[int]:
+    """Splits a bitmask into a list of its individual bits, from lowest to highest."""
+    bits = []
+    while mask:
+        bits.append(bit := mask & -mask)
+        mask ^= bit
+    return bits
+
+class SudokuCandidates:
+    """A class which represents the candidates of each cell and the digits used in each row,
+    column and block as bitmasks, providing a fast alternative to the exact cover table.
+
+    The search places naked and hidden singles until no more can be found,
+    and then branches on the empty cell with the fewest candidates.
+    """
+
+    def __init__(self, sudoku: np.ndarray) -> None:
+        """Constructs the bitmasks of used digits for a given sudoku of any box size."""
+        # Finds the lookup tables for the size of the grid
+        self.tables = tables = grid_tables(math.isqrt(len(sudoku)))
+
+        # Stores the grid as a flat list of native Python integers
+        self.cells = sudoku.reshape(-1).tolist()
+
+        # Bitmasks of the digits used in each row, column and block
+        self.rows = [0] * tables.side
+        self.cols = [0] * tables.side
+        self.blocks = [0] * tables.side
+
+        # Keeps track of whether any digit has been given twice in the same row, column or block
+        self.valid = True
+
+        # Optional statistics which are filled in by each search
+        self.stats = None
+
+        for i, n in enumerate(self.cells):
+            if n == 0:
+                continue
+
+            bit = 1 << (n - 1)
+            row, col, block = tables.cell_rows[i], tables.cell_cols[i], tables.cell_blocks[i]
+            if (self.rows[row] | self.cols[col] | self.blocks[block]) & bit:
+                self.valid = False
+            self.rows[row] |= bit
+            self.cols[col] |= bit
+            self.blocks[block] |= bit
+
+    def propagate(self, cells: list[int], rows: list[int], cols: list[int], blocks: list[int]) -> int:
+        """Repeatedly fills in naked and hidden singles, updating the given lists in place.
+
+        Returns:
+            int: the index of the empty cell with the fewest candidates, or SOLVED
+            if the grid is complete, or CONTRADICTION if the grid can't be completed.
+        """
+        # Stores the lookup tables locally to speed up the loops
+        tables = self.tables
+        all_digits, cell_rows, cell_cols, cell_blocks = tables.all_digits, tables.cell_rows, tables.cell_cols, tables.cell_blocks
+
+        while True:
+            progress = False
+            best_cell, best_count = SOLVED, tables.side + 1
+
+            # Fills in naked singles, which are empty cells with only one candidate
+            for i in range(tables.cells):
+                if cells[i]:
+                    continue
+
+                row, col, block = cell_rows[i], cell_cols[i], cell_blocks[i]
+                candidates = all_digits & ~(rows[row] | cols[col] | blocks[block])
+                if candidates == 0:
+                    return CONTRADICTION
+
+                if candidates & (candidates - 1) == 0:
+                    cells[i] = candidates.bit_length()
+                    rows[row] |= candidates
+                    cols[col] |= candidates
+                    blocks[block] |= candidates
+                    progress = True
+                elif (count := candidates.bit_count()) < best_count:
+                    best_cell, best_count = i, count
+
+            if progress:
+                continue
+
+            # Fills in hidden singles, which are digits that only fit in one cell of a unit
+            for unit in tables.units:
+                once = twice = filled = 0
+                for i in unit:
+                    if cells[i]:
+                        filled |= 1 << (cells[i] - 1)
+                    else:
+                        candidates = all_digits & ~(rows[cell_rows[i]] | cols[cell_cols[i]] | blocks[cell_blocks[i]])
+                        twice |= once & candidates
+                        once |= candidates
+
+                # Every digit must either be in the unit already or have somewhere to go
+                if (once | filled) != all_digits:
+                    return CONTRADICTION
+
+                if not (hidden := once & ~twice):
+                    continue
+
+                for i in unit:
+                    if cells[i]:
+                        continue
+
+                    row, col, block = cell_rows[i], cell_cols[i], cell_blocks[i]
+                    candidates = all_digits & ~(rows[row] | cols[col] | blocks[block])
+                    if not (bit := candidates & hidden):
+                        continue
+
+                    # A cell can't be the only place for two different digits
+                    if bit & (bit - 1):
+                        return CONTRADICTION
+
+                    cells[i] = bit.bit_length()
+                    rows[row] |= bit
+                    cols[col] |= bit
+                    blocks[block] |= bit
+                    progress = True
+
+            if not progress:
+                return best_cell
+
+    def search(self, limit: int = -1, solution: list[tuple] | None = None,
+               rng: np.random.Generator | None = None) -> int:
+        """Searches for solutions by propagating singles and branching on the cell with the fewest candidates.
+
+        Each branch works on its own copy of the grid and bitmasks, which are kept on an
+        explicit stack so that the search depth isn't limited by Python's recursion limit.
+
+        Args:
+            limit (int): an integer defining the limit for how many solutions to find before returning.
+            solution (list[tuple] | None): a list passed by reference, in which the actions
+            to reach the first solution will be stored if one is found.
+            rng (np.random.Generator | None): a random number generator used to try the candidates
+            of each cell in a random order. If not given, candidates are tried in ascending order.
+
+        Returns:
+            int: the amount of solutions that were found.
+        """
+        # A grid with a repeated digit can never be solved
+        if not self.valid:
+            return 0
+
+        tables = self.tables
+        solutions_found = 0
+        stack = [(0, self.cells[:], self.rows[:], self.cols[:], self.blocks[:])]
+
+        # Counters for the states propagated, the contradictions found and the most branches taken at once
+        nodes = backtracks = max_depth = 0
+
+        while stack:
+            depth, cells, rows, cols, blocks = stack.pop()
+            cell = self.propagate(cells, rows, cols, blocks)
+            nodes += 1
+
+            if cell == CONTRADICTION:
+                backtracks += 1
+                continue
+
+            if cell == SOLVED:
+                solutions_found += 1
+
+                # Stores the actions which fill in the empty cells for the first solution found
+                if solution is not None and solutions_found == 1:
+                    solution.extend((i // tables.side, i % tables.side, n)
+                                    for i, n in enumerate(cells) if self.cells[i] == 0)
+
+                if limit > 0 and solutions_found >= limit:
+                    break
+                continue
+
+            # Splits the cell's candidates into individual bits
+            row, col, block = tables.cell_rows[cell], tables.cell_cols[cell], tables.cell_blocks[cell]
+            bits = split_bits(tables.all_digits & ~(rows[row] | cols[col] | blocks[block]))
+
+            if rng is not None:
+                rng.shuffle(bits)
+
+            # Pushes a branch for each candidate, in reverse so the first candidate is tried first
+            depth += 1
+            if depth > max_depth:
+                max_depth = depth
+            for bit in reversed(bits):
+                branch_cells, branch_rows, branch_cols, branch_blocks = cells[:], rows[:], cols[:], blocks[:]
+                branch_cells[cell] = bit.bit_length()
+                branch_rows[row] |= bit
+                branch_cols[col] |= bit
+                branch_blocks[block] |= bit
+                stack.append((depth, branch_cells, branch_rows, branch_cols, branch_blocks))
+
+        if self.stats is not None:
+            self.stats.nodes += nodes
+            self.stats.backtracks += backtracks
+            self.stats.max_depth = max(self.stats.max_depth, max_depth)
+
+        return solutions_found
+
+    def solve(self, solution: list[tuple]) -> bool:
+        """Finds a solution to the sudoku.
+
+        Args:
+            solution (list[tuple]): a list passed by reference, in which the actions
+            to reach a solution will be stored if one is found.
+
+        Returns:
+            bool: whether a solution was found.
+        """
+        return self.search(1, solution) == 1
+
+    def solve_randomly(self, solution: list[tuple], rng: np.random.Generator | None = None) -> bool:
+        """Finds a random solution to the sudoku.
+
+        Args:
+            solution (list[tuple]): a list passed by reference, in which the actions
+            to reach a solution will be stored if one is found.
+            rng (np.random.Generator | None): the random number generator to use,
+            which is freshly seeded from the operating system if not given.
+
+        Returns:
+            bool: whether a solution was found.
+        """
+        return self.search(1, solution, rng or np.random.default_rng()) == 1
+
+    def count_solutions(self, limit: int = -1) -> int:
+        """Finds and counts all solutions to the sudoku.
+
+        Args:
+            limit (int): an integer defining the limit for how many solutions to count before returning.
+
+        Returns:
+            int: the amount of solutions that were found.
+        """
+        return self.search(limit)
+
+    @staticmethod
+    def random_grid(rng: np.random.Generator, box: int = 3) -> list[int]:
+        """Fills an empty grid with random digits, giving a random complete sudoku solution.
+
+        Cells are filled row by row, trying each cell's candidates in a random order. A digit is
+        only placed if it leaves every empty peer with at least one candidate, which avoids the
+        need for any propagation or exact cover table while keeping backtracking rare. Grids
+        larger than 9x9 backtrack far too often when filled this way, so they are filled by the
+        randomised search instead, which always branches on the most constrained cell.
+
+        Neither way of filling the grid chooses uniformly between all solutions, since each choice
+        is made evenly between candidates regardless of how many solutions follow from them.
+
+        Args:
+            rng (np.random.Generator): the random number generator to use.
+            box (int): the size of the grid's blocks, where the standard grid has a box size of 3.
+
+        Returns:
+            list[int]: the digits of the solution, read row by row.
+        """
+        tables = grid_tables(box)
+        if tables.mask_bits is None:
+            solution = []
+            SudokuCandidates(np.zeros((tables.side, tables.side), dtype=int)).solve_randomly(solution, rng)
+            return [n for _, _, n in solution]
+
+        all_digits, cell_rows, cell_cols, cell_blocks = tables.all_digits, tables.cell_rows, tables.cell_cols, tables.cell_blocks
+        mask_bits = tables.mask_bits
+
+        cells = [0] * tables.cells
+        rows, cols, blocks = [0] * tables.side, [0] * tables.side, [0] * tables.side
+        random = rng.random
+
+        # The candidates left to try for the cell at each depth, where depth i fills cell i
+        remaining = [None] * tables.cells
+        depth = 0
+
+        while depth < tables.cells:
+            row, col, block = cell_rows[depth], cell_cols[depth], cell_blocks[depth]
+
+            if remaining[depth] is None:
+                # Finds the candidates for a newly reached cell
+                remaining[depth] = mask_bits[all_digits & ~(rows[row] | cols[col] | blocks[block])][:]
+            else:
+                # Removes the digit previously placed in the cell when backtracking to it
+                bit = 1 << (cells[depth] - 1)
+                rows[row] ^= bit
+                cols[col] ^= bit
+                blocks[block] ^= bit
+                cells[depth] = 0
+
+            # Tries the remaining candidates in a random order until one doesn't leave a peer without candidates
+            candidates = remaining[depth]
+            while candidates:
+                bit = candidates.pop(int(random() * len(candidates)))
+                rows[row] |= bit
+                cols[col] |= bit
+                blocks[block] |= bit
+
+                if all(cells[peer] or all_digits & ~(rows[cell_rows[peer]] | cols[cell_cols[peer]] | blocks[cell_blocks[peer]])
+                       for peer in tables.cell_peers[depth]):
+                    cells[depth] = bit.bit_length()
+                    depth += 1
+                    break
+
+                rows[row] ^= bit
+                cols[col] ^= bit
+                blocks[block] ^= bit
+            else:
+                # Backtracks to the previous cell once every candidate has failed
+                remaining[depth] = None
+                depth -= 1
+
+        return cells
@@ -1,119 +1,328 @@
 """Generates random sudoku puzzles with only one solution."""
 
+import argparse
+import contextlib
+import functools
+import math
+import multiprocessing
 import sys
+import time
 import numpy as np
-from solver import SudokuSolver, SudokuConstraints
+from typing import Callable, Iterator
+from bank import BANK_EXTENSION, BankWriter
+from candidates import SudokuCandidates
+from solver import ListSudokuConstraints, SudokuSolver, print_grid
 
 class SudokuGenerator:
     """A class that provides methods for generating random sudoku solutions and puzzles."""
     @staticmethod
-    def generate_solution(seed=None) -> np.ndarray:
+    def generate_solution(seed=None, rng: np.random.Generator | None = None, box: int = 3) -> np.ndarray:
         """Generates a random sudoku solution.
         
         Args:
-            seed: the seed for the random number generator.
+            seed: the seed for a new random number generator, used if rng isn't given.
+            rng (np.random.Generator | None): the random number generator to use.
+            box (int): the size of the grid's blocks, where a box size of 3 gives a standard 9x9 sudoku.
 
         Returns:
-            np.ndarray: 9x9 numpy array containing the randomly generated
-            sudoku solution.
+            np.ndarray: numpy array with a side of box^2 containing the randomly
+            generated sudoku solution.
         """
-        # Sets the seed for the numpy random number generator
-        np.random.seed(seed)
+        # Creates a random number generator from the seed if one isn't given
+        if rng is None:
+            rng = np.random.default_rng(seed)
 
-        # Creates an empty sudoku grid
-        sudoku = np.zeros((9, 9), dtype=int)
+        return SudokuGenerator.generate_solutions(1, rng, box)[0]
 
-        # Fills diagonal 3x3s with random numbers for best random starting point
-        for i, j in [(0, 3), (3, 6), (6, 9)]:
-            sudoku[i:j, i:j] = np.random.permutation(range(1, 10)).reshape(3, 3)
+    @staticmethod
+    def generate_solutions(n: int, rng: np.random.Generator, box: int = 3) -> np.ndarray:
+        """Generates many random sudoku solutions at once.
 
-        # Creates constraints for the sudoku
-        constraints = SudokuConstraints(sudoku)
+        Each grid is filled by a randomised search over candidate bitmasks, and then shuffled
+        by a random symmetry of the sudoku. The shuffle makes every grid equivalent to the one
+        found by the search equally likely, but the grids are not uniformly distributed over all
+        sudoku solutions, since the search finds some classes of equivalent grids more often than
+        others. For example, the 288 4x4 solutions are each returned between about half and one and
+        a half times as often as they would be by a uniform choice.
 
-        # Finds a random solution to the sudoku
-        solution_actions = []
-        constraints.solve_randomly(solution_actions)
+        Args:
+            n (int): the number of solutions to generate.
+            rng (np.random.Generator): the random number generator to use.
+            box (int): the size of the grid's blocks, where a box size of 3 gives a standard 9x9 sudoku.
+
+        Returns:
+            np.ndarray: (n, box^2, box^2) numpy array containing the randomly generated sudoku solutions.
+        """
+        side = box * box
+        grids = np.array([SudokuCandidates.random_grid(rng, box) for _ in range(n)], dtype=int).reshape((n, side, side))
+        return SudokuGenerator.shuffle_grids(grids, rng)
+
+    @staticmethod
+    def shuffle_grids(grids: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Applies an independent random symmetry to each of a stack of sudoku grids.
+
+        The symmetries relabel the digits, permute the bands and the rows within each band,
+        permute the stacks and the columns within each stack, and transpose the grid.
+        None of these affect whether a grid is valid or how many solutions it has.
+
+        Args:
+            grids (np.ndarray): (n, s, s) numpy array of sudoku grids of any size, where empty cells are stored as 0.
+            rng (np.random.Generator): the random number generator to use.
+
+        Returns:
+            np.ndarray: (n, s, s) numpy array containing the shuffled grids.
+        """
+        n, side = len(grids), grids.shape[1]
+        box = math.isqrt(side)
+
+        # Random permutations of the digits, where empty cells are always mapped to 0
+        labels = np.zeros((n, side + 1), dtype=grids.dtype)
+        labels[:, 1:] = rng.permuted(np.tile(np.arange(1, side + 1), (n, 1)), axis=1)
+
+        # Random permutations of the rows and columns which keep each band and stack together
+        def line_permutations() -> np.ndarray:
+            bands = rng.permuted(np.tile(np.arange(box), (n, 1)), axis=1)
+            lines = rng.permuted(np.tile(np.arange(box), (n, box, 1)), axis=2)
+            return (bands[:, :, None] * box + lines).reshape((n, side))
+        rows, cols = line_permutations(), line_permutations()
+
+        # Rearranges the cells and relabels their digits
+        shuffled = grids[np.arange(n)[:, None, None], rows[:, :, None], cols[:, None, :]]
+        shuffled = np.take_along_axis(labels, shuffled.reshape((n, side * side)), axis=1).reshape((n, side, side))
+
+        # Transposes half of the grids
+        transpose = rng.random(n) < 0.5
+        shuffled[transpose] = shuffled[transpose].transpose((0, 2, 1))
+        return shuffled
 
-        # Carries out the actions to complete the sudoku
-        for row, col, n in solution_actions:
-            sudoku[row, col] = n
-        
-        # Returns the newly generated solution
-        return sudoku
-    
     @staticmethod
-    def minimalise(sudoku):
-        """Recursively removes symbols from a sudoku until it is minimal."""
-        # Finds row and column indices of non-empty cells
+    def minimalise(sudoku: np.ndarray, constraints: ListSudokuConstraints | None = None,
+                   rng: np.random.Generator | None = None) -> int:
+        """Removes symbols from a sudoku until it is minimal.
+
+        Each clue is tested once in a random order. A clue which can't be removed without
+        losing the unique solution stays fixed, since removing more clues can only
+        ever allow more solutions, so the sudoku is minimal after a single pass.
+
+        Args:
+            sudoku (np.ndarray): square numpy array containing the sudoku to minimalise in place.
+            constraints (ListSudokuConstraints): a table of constraints for an empty grid in which
+            every clue of the sudoku has been assumed. It is created if not given, and is reused
+            by every uniqueness check so that removing a clue only has to retract its row.
+            rng (np.random.Generator | None): the random number generator to use,
+            which is freshly seeded from the operating system if not given.
+
+        Returns:
+            int: the number of uniqueness checks that were made.
+        """
+        # Finds row and column indices of non-empty cells, and a random order to try removing them in
         rows, cols = np.where(sudoku != 0)
-        p = np.random.permutation(len(rows))
+        p = (rng or np.random.default_rng()).permutation(len(rows))
+        rows, cols = rows[p], cols[p]
+
+        # Creates a table for an empty grid and assumes every clue in the sudoku, in reverse
+        # order so that the next clue to be removed is always close to the top of the stack
+        if constraints is None:
+            constraints = ListSudokuConstraints(np.zeros_like(sudoku))
+            for row, col in zip(rows[::-1], cols[::-1]):
+                constraints.assume(row, col, sudoku[row, col])
 
-        # Loops through a random permutation of these rows and columns
-        for row, col in zip(rows[p], cols[p]):
-            # Stores the cell's value and empties it
+        checks = 0
+        for row, col in zip(rows, cols):
+            # Stores the cell's value, empties it and retracts it from the constraints
             n = sudoku[row, col]
             sudoku[row, col] = 0
+            constraints.retract(row, col, n)
 
             # Tests if the sudoku still has a unique solution
-            if SudokuSolver.count_solutions(sudoku, 2) == 1:
-                return SudokuGenerator.minimalise(sudoku)
+            checks += 1
+            if constraints.count_solutions(2) == 1:
+                continue
 
-            # If no unique solution was found, reset the cell
+            # If no unique solution was found, the clue is required so the cell is reset
             sudoku[row, col] = n
-        
+            constraints.assume(row, col, n)
+
+        return checks
+
     @staticmethod
-    def generate_puzzle(seed=None) -> np.ndarray:
+    def generate_puzzle(seed=None, rng: np.random.Generator | None = None, box: int = 3) -> np.ndarray:
         """Generates a random minimal sudoku puzzle.
         
         Args:
-            seed: the seed for the random number generator.
+            seed: the seed for a new random number generator, used if rng isn't given.
+            rng (np.random.Generator | None): the random number generator to use.
+            box (int): the size of the grid's blocks, where a box size of 3 gives a standard 9x9 sudoku.
+
+        Returns:
+            np.ndarray: numpy array with a side of box^2 containing the randomly
+            generated minimal sudoku puzzle.
+        """
+        return SudokuGenerator.generate_puzzle_and_solution(seed, rng, box)[0]
+
+    @staticmethod
+    def generate_puzzle_and_solution(seed=None, rng: np.random.Generator | None = None,
+                                     box: int = 3) -> tuple[np.ndarray, np.ndarray]:
+        """Generates a random minimal sudoku puzzle along with its solution, which is the grid
+        the puzzle was made from, so the puzzle never needs to be solved.
+
+        Args:
+            seed: the seed for a new random number generator, used if rng isn't given.
+            rng (np.random.Generator | None): the random number generator to use.
+            box (int): the size of the grid's blocks, where a box size of 3 gives a standard 9x9 sudoku.
 
         Returns:
-            np.ndarray: 9x9 numpy array containing the randomly generated
-            minimal sudoku puzzle.
+            tuple[np.ndarray, np.ndarray]: the same puzzle that generate_puzzle would give for the
+            same seed or generator, and its unique solution.
         """
-        # Generates a random solution
-        sudoku = SudokuGenerator.generate_solution(seed)
+        # Creates a random number generator from the seed if one isn't given
+        if rng is None:
+            rng = np.random.default_rng(seed)
+
+        # Generates a random solution, keeping a copy of it before any symbols are removed
+        solution = SudokuGenerator.generate_solution(rng=rng, box=box)
+        sudoku = solution.copy()
 
         # Removes symbols until the puzzle is minimal
-        SudokuGenerator.minimalise(sudoku)
+        SudokuGenerator.minimalise(sudoku, rng=rng)
+
+        # Returns the complete puzzle and its solution
+        return sudoku, solution
+
+    @staticmethod
+    def puzzle_rng(seed: int, index: int) -> np.random.Generator:
+        """Creates the random number generator for a single puzzle in a numbered sequence of puzzles.
+
+        Args:
+            seed (int): the seed for the whole sequence of puzzles.
+            index (int): the position of the puzzle in the sequence.
+
+        Returns:
+            np.random.Generator: an independent generator which only depends on the sequence seed and the index.
+        """
+        return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+    @staticmethod
+    def generate_puzzles(count: int, seed: int, workers: int | None = 1, chunksize: int = 16,
+                         progress: Callable[[int, float], None] | None = None,
+                         progress_interval: int = 1000, box: int = 3,
+                         solutions: bool = False) -> Iterator[np.ndarray | tuple[np.ndarray, np.ndarray]]:
+        """Generates a reproducible sequence of random minimal sudoku puzzles.
+
+        Each puzzle is generated from its own seed derived from the sequence seed and its index,
+        so the same puzzles are produced in the same order regardless of the number of workers.
 
-        # Returns the complete puzzle
-        return sudoku
+        Args:
+            count (int): the number of puzzles to generate.
+            seed (int): the seed for the whole sequence of puzzles.
+            workers (int | None): the number of worker processes to generate puzzles with,
+            where None uses the CPU count and 1 generates them in the current process.
+            chunksize (int): how many puzzles are generated by each task.
+            progress (Callable[[int, float], None] | None): an optional function called
+            with the number of puzzles generated and the seconds elapsed so far.
+            progress_interval (int): roughly how many puzzles to generate between calls to progress.
+            box (int): the size of the grids' blocks, where a box size of 3 gives standard 9x9 sudokus.
+            solutions (bool): whether to yield the solution of each puzzle along with it.
+
+        Yields:
+            np.ndarray | tuple[np.ndarray, np.ndarray]: numpy array with a side of box^2 containing each randomly
+            generated minimal sudoku puzzle, or the puzzle and its solution if solutions is True.
+        """
+        start_time = time.perf_counter()
+        generated = 0
+
+        # Splits the puzzle indices into chunks to be generated by each task
+        chunks = (range(start, min(start + chunksize, count)) for start in range(0, count, chunksize))
+        generate_chunk = functools.partial(_generate_chunk, seed=seed, box=box, solutions=solutions)
+
+        with multiprocessing.Pool(workers) if workers != 1 else contextlib.nullcontext() as pool:
+            # Chunks are returned in order as soon as each one is ready
+            for puzzles in (pool.imap if pool else map)(generate_chunk, chunks):
+                yield from puzzles
+
+                # Reports the number of puzzles generated whenever another interval is passed
+                previous, generated = generated, generated + len(puzzles)
+                if progress is not None and generated // progress_interval > previous // progress_interval:
+                    progress(generated, time.perf_counter() - start_time)
+
+        # Reports the final totals once every puzzle has been generated
+        if progress is not None:
+            progress(generated, time.perf_counter() - start_time)
+
+def _generate_chunk(indices: range, seed: int, box: int, solutions: bool) -> np.ndarray | list[tuple]:
+    """Generates the puzzles at a range of indices in a sequence, returning them stacked in one array,
+    or a list of each puzzle paired with its solution if solutions are wanted."""
+    pairs = [SudokuGenerator.generate_puzzle_and_solution(rng=SudokuGenerator.puzzle_rng(seed, i), box=box) for i in indices]
+    return pairs if solutions else np.stack([puzzle for puzzle, _ in pairs])
+
+def report_progress(generated: int, elapsed: float) -> None:
+    """Reports bulk generation progress and throughput to stderr."""
+    rate = generated / elapsed if elapsed > 0 else 0
+    print(f"Generated {generated} puzzles in {elapsed:.2f}s ({rate:.1f} puzzles/s)", file=sys.stderr)
 
 if __name__ == '__main__':
-    argv = sys.argv[1:]
+    parser = argparse.ArgumentParser()
 
-    # Ensures the correct amount of command line arguments are specified
-    if len(argv) > 1:
-        print("There should be at most 1 command line argument specified.")
-        exit()
+    # Adds command line arguments to be parsed
+    parser.add_argument("print_mode", nargs="?", type=int, choices=[0, 1], default=0,
+        help="the output print mode, 0 is a sudoku string and 1 is a pretty printed grid")
+    parser.add_argument("-n", "--count", type=int, default=None,
+        help="the number of puzzles to generate in bulk")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+        help="the number of processes to generate puzzles with, 0 uses every CPU")
+    parser.add_argument("-s", "--seed", type=int, default=None,
+        help="the seed to generate puzzles from, which is chosen randomly if not given")
+    parser.add_argument("-o", "--output", default=None,
+        help="file to write the generated puzzles to, as a puzzle bank if it ends in .bank (defaults to stdout)")
+    parser.add_argument("-b", "--box", type=int, choices=[2, 3, 4, 5], default=3,
+        help="the size of each block, 3 gives a standard 9x9 sudoku and 4 or 5 give 16x16 or 25x25 sudokus")
+
+    # Parses the command line arguments
+    args = parser.parse_args()
+
+    if args.jobs < 0:
+        parser.error("the number of jobs must be at least 0")
+    if args.seed is not None and args.seed < 0:
+        parser.error("the seed must be at least 0")
 
-    # Parses the optional print mode argument
-    print_mode = 0
-    if len(argv) > 0:
-        print_mode = argv[0]
-        if print_mode != '0' and print_mode != '1':
-            print("The command line argument must be '0' or '1' specifying the output print mode.")
-            exit()
-        else:
-            print_mode = int(print_mode)
-
-    # Generates a sudoku with a random seed
-    sudoku = SudokuGenerator.generate_puzzle()
-    
-    # Outputs sudoku in a string format if print mode is 0
-    if print_mode == 0:
-        print(''.join(map(str, sudoku.reshape(-1))))
+    # Banks store the solution of each puzzle, which is the grid it was generated from
+    to_bank = args.output is not None and args.output.endswith(BANK_EXTENSION)
+
+    if args.count is None:
+        # Generates a single sudoku when no count is given
+        sudokus = [SudokuGenerator.generate_puzzle_and_solution(args.seed, box=args.box)]
+        if not to_bank:
+            sudokus = [sudokus[0][0]]
+    elif args.count < 1:
+        parser.error("the number of puzzles must be at least 1")
+    else:
+        # Chooses and reports a random seed if none is given, so that the run can be reproduced
+        if args.seed is None:
+            args.seed = int(np.random.SeedSequence().generate_state(1)[0])
+            print(f"Generating puzzles with seed {args.seed}", file=sys.stderr)
+        sudokus = SudokuGenerator.generate_puzzles(args.count, args.seed, args.jobs or None,
+            progress=report_progress, box=args.box, solutions=to_bank)
+
+    # Writes the puzzles and their solutions to a bank if the output has the bank extension
+    if to_bank:
+        with BankWriter(args.output, args.box * args.box, solutions=True) as bank_writer:
+            for sudoku, solution in sudokus:
+                bank_writer.write(sudoku, solution)
         exit()
 
-    # Pretty prints the sudoku for easy reading if print mode is 1
-    for y in range(9):
-        # Prints the entire current row
-        for x in range(9):
-            if x % 3 == 0 and x > 0:
-                print("|", end="")
-            print(f"{sudoku[y, x] if sudoku[y, x] != 0 else ' '}", end="")
-        
-        # Prints row divider if necessary
-        print("\n---+---+---" if (y + 1) % 3 == 0 and y < 8 else "")
+    output_file = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for i, sudoku in enumerate(sudokus):
+            # Outputs sudoku in a string format if print mode is 0
+            if args.print_mode == 0:
+                output_file.write(SudokuSolver.to_string(sudoku) + "\n")
+                continue
+
+            # Pretty prints the sudoku for easy reading if print mode is 1, separating grids with a blank line
+            if i > 0:
+                print(file=output_file)
+            print_grid(sudoku, output_file)
+    finally:
+        output_file.flush()
+        if output_file is not sys.stdout:
+            output_file.close()
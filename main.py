@@ -4,7 +4,11 @@ import pygame
 import os
 import numpy as np
 import argparse
+import multiprocessing
+import queue
+import signal
 import time
+from bank import PuzzleBank
 from solver import SudokuSolver
 from board import SudokuBoard
 from generator import SudokuGenerator
@@ -14,38 +18,105 @@ MINIMUM_DIMENSIONS = 200
 DEFAULT_DIMENSIONS = 800
 MINIMUM_FRAMERATE = 24
 DEFAULT_FRAMERATE = 60
+PREFETCH_SIZE = 3
+
+# The random generator used to draw puzzles from a bank
+BANK_RNG = np.random.default_rng()
 
 # Methods
-def set_sudoku(board: SudokuBoard, sudoku=None) -> tuple[np.ndarray, np.ndarray]:
-    """Sets the sudoku for the board or generates a new puzzle."""
-    if sudoku is None:
-        sudoku = SudokuGenerator.generate_puzzle()
-    solution = SudokuSolver.solve(sudoku.copy())
-    board.set_sudoku(sudoku)
+def set_sudoku(board: SudokuBoard, sudoku=None, solution=None, bank: PuzzleBank | None = None,
+               prefetched: 'multiprocessing.Queue | None' = None) -> tuple[np.ndarray, np.ndarray]:
+    """Sets the sudoku for the board along with its solution if it's known, or draws a new puzzle from
+    the bank if one is given, or takes one that was generated in the background, or generates one if none are ready."""
+    if sudoku is not None:
+        board.set_sudoku(sudoku, solution)
+        return sudoku, board.solution
+
+    # Takes a puzzle and solution from the background process if one is ready
+    if prefetched is not None:
+        try:
+            sudoku, solution = prefetched.get_nowait()
+            board.set_sudoku(sudoku, solution)
+            return sudoku, solution
+        except queue.Empty:
+            pass
+
+    # Draws a random puzzle from the bank, falling back to generating one if it isn't a valid puzzle
+    if bank is not None:
+        sudoku, solution = draw_puzzle(bank)
+        if board.set_sudoku(sudoku, solution):
+            return sudoku, board.solution
+
+    # Generates a puzzle along with the solution it was made from, so it doesn't need to be solved
+    sudoku, solution = SudokuGenerator.generate_puzzle_and_solution()
+    board.set_sudoku(sudoku, solution)
     return sudoku, solution
 
-def sudoku_argument(arg: str) -> np.ndarray | None:
-    """Parses the sudoku string command line argument."""
+def draw_puzzle(bank: PuzzleBank) -> tuple[np.ndarray, np.ndarray | None]:
+    """Reads a random puzzle from a bank, along with its solution if the bank stores one."""
+    index = BANK_RNG.integers(len(bank))
+
+    # Copies the puzzle out of the bank's read-only memory map so that it can be played
+    sudoku = bank.puzzles[index].astype(int)
+
+    # A solution of all zeros means the puzzle doesn't have a unique solution, so it's left for the board to check
+    solution = None
+    if bank.solutions is not None and bank.solutions[index].any():
+        solution = bank.solutions[index].astype(int)
+
+    return sudoku, solution
+
+def prefetch_puzzles(prefetched: 'multiprocessing.Queue', store_path: str | None) -> None:
+    """Generates puzzles along with their solutions in a background process, keeping the
+    queue filled so that new games can start without waiting for a puzzle to be generated."""
+    # Leaves interrupts to the game, and opens a connection to the store for this process without
+    # closing the game's connection, which is inherited when the process is forked
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    SudokuSolver.set_store(store_path, close=False)
+
+    # Blocks while the queue is full, so only a few puzzles are generated ahead
+    while True:
+        prefetched.put(SudokuGenerator.generate_puzzle_and_solution())
+
+def sudoku_argument(arg: str) -> tuple[np.ndarray, np.ndarray] | None:
+    """Parses the sudoku string command line argument, returning the sudoku and its solution."""
     if arg is None:
         return arg
 
-    # Gets the sudoku string from command line arguments
-    sudoku_string = arg.replace('.', '0')
+    # Converts string input to a numpy array containing the sudoku
+    try:
+        sudoku = SudokuSolver.from_string(arg)
+    except ValueError:
+        sudoku = None
 
-    # Ensures sudoku string is of the correct format
-    if len(sudoku_string) != 81 or not sudoku_string.isnumeric():
+    # Ensures sudoku string is of the correct format, since the board can only display 9x9 sudokus
+    if sudoku is None or sudoku.shape != (9, 9):
         raise argparse.ArgumentTypeError(
             "sudoku puzzle must be represented as a string of 81 digits from 0-9")
 
-    # Converts string input to a numpy array containing the sudoku
-    sudoku = np.array(list(sudoku_string), dtype=int).reshape((9, 9))
-
-    # Ensures the sudoku only has one solution
-    if SudokuSolver.count_solutions(sudoku, 2) != 1:
+    # Ensures the sudoku only has one solution, keeping the solution found so it isn't solved again
+    count, solution = SudokuSolver.analyse(sudoku)
+    if count != 1:
         raise argparse.ArgumentTypeError(
             "sudoku puzzle must have a single solution to be valid")
 
-    return sudoku
+    return sudoku, solution
+
+def bank_argument(arg: str) -> PuzzleBank:
+    """Parses the puzzle bank command line argument."""
+    # Opens the bank, which only reads its header until puzzles are drawn from it
+    try:
+        bank = PuzzleBank(arg)
+    except (OSError, ValueError) as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+    # Ensures the bank contains puzzles which can be displayed by the board
+    if bank.side != 9:
+        raise argparse.ArgumentTypeError("puzzle bank must contain 9x9 sudokus")
+    if len(bank) == 0:
+        raise argparse.ArgumentTypeError("puzzle bank must contain at least one sudoku")
+
+    return bank
 
 def dimensions_argument(arg: str) -> int:
     """Parses the dimensions command line argument."""
@@ -71,24 +142,37 @@ def seconds_to_minutes(seconds: int) -> str:
 
 # Main Loop
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser()
+    # Opens the solution store before the other arguments are parsed, so that it's used when checking the sudoku
+    store_parser = argparse.ArgumentParser(add_help=False)
+    store_parser.add_argument("--store", default=None,
+        help="the path of a file storing solutions between runs, which is created if it doesn't exist")
+    store_path = store_parser.parse_known_args()[0].store
+    SudokuSolver.set_store(store_path)
+
+    parser = argparse.ArgumentParser(parents=[store_parser])
 
     # Adds command line arguments to be parsed
     parser.add_argument("-s", "--sudoku", type=sudoku_argument, default=None, 
         help="sudoku string to initialise the program with")
+    parser.add_argument("-b", "--bank", type=bank_argument, default=None,
+        help="puzzle bank file to draw new sudokus from instead of generating them")
     parser.add_argument("-a", "--appearance", type=int, choices=[0, 1], default=0,
         help="the appearance of the program, 0 is light mode and 1 is dark mode")
     parser.add_argument("-d", "--dimensions", type=dimensions_argument, default=DEFAULT_DIMENSIONS, 
         help="the size of the square display window in pixels")
     parser.add_argument("-f", "--framerate", type=framerate_argument, default=DEFAULT_FRAMERATE,
         help="the maximum framerate of the program")
+    parser.add_argument("-i", "--idle", action="store_true",
+        help="wait for input instead of running at the framerate while nothing is changing")
 
     # Parses the command line arguments
     args = parser.parse_args()
-    sudoku = args.sudoku
+    sudoku, solution = args.sudoku or (None, None)
+    bank = args.bank
     appearance = [SudokuBoard.LIGHT_MODE, SudokuBoard.DARK_MODE][args.appearance]
     win_size = args.dimensions
     framerate = args.framerate
+    idle = args.idle
 
     # Calculates values for the board's tile size and position
     tile_size = win_size // 15
@@ -96,6 +180,12 @@ if __name__ == '__main__':
     board_screen_pos = (win_size - board_size) // 2
     board_pos = (board_screen_pos, board_screen_pos)
 
+    # Starts generating puzzles in the background, unless puzzles are drawn from a bank
+    prefetched = None
+    if bank is None:
+        prefetched = multiprocessing.Queue(PREFETCH_SIZE)
+        multiprocessing.Process(target=prefetch_puzzles, args=(prefetched, store_path), daemon=True).start()
+
     # Pygame setup
     window = pygame.display.set_mode((win_size, win_size))
     pygame.display.set_caption("Sudoku")
@@ -109,7 +199,7 @@ if __name__ == '__main__':
 
     # Sets up the board and creates the starting sudoku
     board = SudokuBoard(tile_size, board_pos, appearance)
-    sudoku, solution = set_sudoku(board, sudoku)
+    sudoku, solution = set_sudoku(board, sudoku, solution, bank)
     
     ui_font = pygame.font.SysFont("", tile_size)
     victory_text = ui_font.render("Sudoku complete!", True, board.colours["text"])
@@ -117,17 +207,28 @@ if __name__ == '__main__':
     # Initialises loop variables
     running = True
     over = False
+    show_text = False
     start_time = time.time()
 
     # Main game loop
     while running:
         clock.tick(framerate)
-        for event in pygame.event.get():
+
+        # Sleeps until the next event in idle mode if there is nothing waiting to be drawn
+        events = pygame.event.get()
+        if idle and not events and not board.dirty and not board.redraw_all:
+            events = [pygame.event.wait()]
+
+        for event in events:
             if event.type == pygame.QUIT:
                 # Ensures safe exiting from the application
                 running = False
                 pygame.quit()
                 exit()
+            elif event.type == pygame.VIDEOEXPOSE:
+                # Redraws the whole window when it has been uncovered
+                board.redraw_all = True
+                show_text = over
             elif event.type == pygame.MOUSEMOTION and not over:
                 # Detects mouse motion and updates the board's hovered cell
                 mouse_pos = pygame.mouse.get_pos()
@@ -140,7 +241,7 @@ if __name__ == '__main__':
                 if event.key == pygame.K_r:
                     # Resets the sudoku when the 'R' key is pressed
                     over = False
-                    sudoku, solution = set_sudoku(board)
+                    sudoku, solution = set_sudoku(board, bank=bank, prefetched=prefetched)
                     start_time = time.time()
                 elif event.key == pygame.K_SPACE and not over:
                     # Allows the board to be cleared using the space key
@@ -148,6 +249,9 @@ if __name__ == '__main__':
                 elif event.key == pygame.K_z and not over:
                     # Allows changes to be undone using the 'Z' key
                     board.undo()
+                elif event.key == pygame.K_y and not over:
+                    # Allows undone changes to be redone using the 'Y' key
+                    board.redo()
                 elif board.selected and not over:
                     # Allows the selected cell to be cleared and set using the keyboard
                     if event.key == pygame.K_BACKSPACE or event.key == pygame.K_DELETE:
@@ -164,8 +268,8 @@ if __name__ == '__main__':
                     elif event.key == pygame.K_UP:
                         board.move_selection((0, -1))
                     
-        # Draws the sudoku board to the window
-        board.draw(window)
+        # Draws the parts of the sudoku board that have changed to the window
+        rects = board.draw(window)
 
         # Detects if the game is over
         if not over and board.check_solution():
@@ -173,11 +277,13 @@ if __name__ == '__main__':
             time_elapsed = time.time() - start_time
             board.deselect_all()
             time_text = ui_font.render(f"Time elapsed: {seconds_to_minutes(time_elapsed)}", True, board.colours["text"])
+            show_text = True
 
-        # Displays UI text for victory and time elapsed when a sudoku is completed
-        if over:
-            window.blit(victory_text, ((win_size - victory_text.get_width()) // 2, int(1.2 * tile_size)))
-            window.blit(time_text, ((win_size - time_text.get_width()) // 2, win_size - 2 * tile_size))
+        # Displays UI text for victory and time elapsed once a sudoku is completed, since it stays on the window until it's redrawn
+        if show_text:
+            show_text = False
+            rects.append(window.blit(victory_text, ((win_size - victory_text.get_width()) // 2, int(1.2 * tile_size))))
+            rects.append(window.blit(time_text, ((win_size - time_text.get_width()) // 2, win_size - 2 * tile_size)))
         
-        # Update the display after everything has been drawn
-        pygame.display.update()
\ No newline at end of file
+        # Updates only the areas of the display that have been drawn to
+        pygame.display.update(rects)
\ No newline at end of file
@@ -1,109 +1,198 @@
 """Solves sudoku puzzles by representing them as an exact cover problem."""
 
 import numpy as np
+import argparse
+import functools
+import itertools
+import math
+import multiprocessing
 import sys
+import time
+from typing import Callable, Iterable, Iterator
+from bank import BANK_EXTENSION, BankWriter, PuzzleBank, is_bank
+from cache import SolutionCache
+from candidates import SudokuCandidates
+from store import SolutionStore
+
+# The symbols used for each digit in sudoku strings, where grids larger than 9x9 use letters for digits from 10 upwards
+SYMBOLS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Maps each character code to the digit of the symbol it represents, or -1 if it isn't a symbol
+SYMBOL_VALUES = np.full(256, -1)
+SYMBOL_VALUES[[ord(c) for c in SYMBOLS]] = np.arange(len(SYMBOLS))
+SYMBOL_VALUES[[ord(c) for c in SYMBOLS[10:].lower()]] = np.arange(10, len(SYMBOLS))
+SYMBOL_VALUES[ord('.')] = 0
+
+# Connections to the solution store inherited from a parent process, which are kept alive for the
+# life of the process since freeing them would close the parent's connection from the child
+_inherited_stores: list[SolutionStore] = []
+
+class SearchStats:
+    """A class that collects statistics about the work done to solve a sudoku, for finding out why some puzzles are slow.
+
+    Statistics are only collected by searches on a table whose stats attribute has been set to
+    an instance of this class, and they accumulate over every search made on that table.
+
+    Attributes:
+        nodes (int): the number of rows tried, or states propagated by the bitmask engine.
+        backtracks (int): the number of dead ends reached, where a column had no rows left
+        to try or the bitmask engine found a contradiction.
+        covers (int): the number of calls to cover during the search.
+        uncovers (int): the number of calls to uncover during the search.
+        max_depth (int): the largest number of choices made at once.
+        build_time (float): the seconds spent constructing the table.
+        search_time (float): the seconds spent searching.
+    """
+
+    def __init__(self) -> None:
+        """Creates a set of statistics with every counter at 0."""
+        self.nodes = 0
+        self.backtracks = 0
+        self.covers = 0
+        self.uncovers = 0
+        self.max_depth = 0
+        self.build_time = 0.0
+        self.search_time = 0.0
+
+    def as_dict(self) -> dict:
+        """Gets the statistics as a dictionary."""
+        return dict(vars(self))
+
+    def __repr__(self) -> str:
+        return "SearchStats(" + ", ".join(f"{name}={value!r}" for name, value in vars(self).items()) + ")"
 
 class SudokuConstraints:
     """A class which uses a 2 dimensional doubly circular linked list to represent the constraints for solving a sudoku."""
 
     def __init__(self, sudoku: np.ndarray) -> None:
-        """Constructs a new table of constraints to solve a given sudoku.""" 
+        """Constructs a new table of constraints to solve a given sudoku of any box size.
+
+        Raises:
+            ValueError: if the sudoku isn't a square grid whose side is a square number.
+        """
+        side = len(sudoku)
+        if sudoku.shape != (side, side) or math.isqrt(side) ** 2 != side:
+            raise ValueError(f"sudoku grid must be square with a square side length, not {sudoku.shape}")
+
+        # Finds the actions and constraints shared by every table for this size of grid
+        self.side = side
+        self.action_tuples, self.action_constraints = action_tables(math.isqrt(side))
+
+        columns_n = 4 * side * side         # There are 4 constraints for each cell, which is 324 for a 9x9 sudoku
+        cells = sudoku.reshape(-1)
+
+        # Arrays to store each column's size and whether they've been covered, where a column
+        # never has more rows than the side of the grid
+        self.sizes = np.full(columns_n, 0, dtype=np.int16)
+        self.covered = np.full(columns_n, 0, dtype=np.int8)
+
+        # Mark already satisfied constraints as covered
+        given = np.flatnonzero(cells)
+        self.covered[self.action_constraints[given * side + cells[given] - 1]] = 1
+
+        # Finds every action for the empty cells which doesn't conflict with a satisfied constraint
+        empty = np.flatnonzero(cells == 0)
+        candidates = (empty[:, None] * side + np.arange(side)).reshape(-1)
+        candidates = candidates[~self.covered[self.action_constraints[candidates]].any(axis=1)]
+
         # Calculates the dimensions and amount of nodes needed to represent the constraints table
-        columns_n = 324                     # There are always 324 constraints for a sudoku puzzle
-        rows_n = 9 * (sudoku == 0).sum()    # There can be at most 9 rows per empty cell
-        nodes = 4 * rows_n + columns_n      # Each row has 4 nodes, and there's a header node for each constraint
+        rows_n = len(candidates)            # There is a row for each remaining action
+        nodes = 4 * rows_n + columns_n + 1  # Each row has 4 nodes, and there's a header node for each constraint and the root
 
-        # Arrays to store each column's size and whether they've been covered
-        self.sizes = np.full(columns_n, 0)
-        self.covered = np.full(columns_n, 0)
+        # The root node heads the list of column headers which are yet to be covered
+        self.root = columns_n
 
         # The max size a column can be
         self.max_size = rows_n
 
+        # Uses the narrowest integer type which can hold every node and action index,
+        # which is 16 bits for a 9x9 sudoku, to keep the table small and close together in memory
+        dtype = np.int16 if max(nodes, side ** 3) <= np.iinfo(np.int16).max else np.int32
+
+        # Packs the up, down, left and right links and the column of each node into a single buffer
+        self.links = np.empty((5, nodes), dtype=dtype)
+        self.up, self.down, self.left, self.right, self.columns = self.links
+
+        # The indexes of each row's 4 nodes, and the constraints they belong to
+        row_nodes = np.arange(columns_n + 1, nodes)
+        row_constraints = self.action_constraints[candidates].reshape(-1)
+        self.sizes += np.bincount(row_constraints, minlength=columns_n)
+
         # Array to store which column each node belongs to
-        self.columns = np.arange(nodes)
+        self.columns[:] = np.arange(nodes)
+        self.columns[row_nodes] = row_constraints
 
-        # Array to hold the sudoku action that each row represents
-        self.actions = np.full(nodes, np.nonzero)
+        # Array to hold the index of the sudoku action that each row represents, or -1 for header nodes
+        self.actions = np.full(nodes, -1, dtype=dtype)
+        self.actions[row_nodes] = np.repeat(candidates, 4)
 
-        # Creates basic up and down pointers, where each node points to itself
-        self.up = np.arange(nodes)
-        self.down = np.arange(nodes)
+        # Array mapping each possible action to the first node of its row, or -1 if it isn't in the table
+        self.action_rows = np.full(side ** 3, -1, dtype=dtype)
+        self.action_rows[candidates] = row_nodes[::4]
+
+        # Stack of the rows which have been assumed to be part of the solution
+        self.assumptions = []
+
+        # Optional statistics which are filled in by each search
+        self.stats = None
 
         # Creates and links left and right pointers
-        self.left = np.arange(-1, nodes - 1)
-        self.right = np.arange(1, nodes + 1)
-        self.left[range(columns_n, nodes, 4)] += 4
-        self.right[range(columns_n + 3, nodes, 4)] -= 4
-        
-        # Mark already satisfied constraints as covered
-        rows, cols = np.where(sudoku != 0)
-        for row, col in zip(rows, cols):
-            for constraint in self.get_constraints(row, col, sudoku[row, col]):
-                self.covered[constraint] = 1
-
-        # Add remaining necessary rows to the table
-        next_index = columns_n
-        last_nodes = np.arange(columns_n)
-        rows, cols = np.where(sudoku == 0)
-        for row, col in zip(rows, cols):
-            for n in range(1, 10):
-                next_index = self.add_row(next_index, row, col, n, last_nodes)
-                
-        # Finishes linking the columns in a circle
-        for c in range(columns_n):
-            if not self.covered[c]:
-                self.link_below(last_nodes[c], c)
-
-    def get_constraints(self, row: int, col: int, n: int) -> tuple[int, int, int, int]:
-        """Gets the constraints for a given row, column and number in the sudoku grid."""
-        # Stores multiplied row and adjusted n to speed up constraint creation 
-        multiplied_row = row * 9
+        self.left[:] = np.arange(-1, nodes - 1)
+        self.right[:] = np.arange(1, nodes + 1)
+        self.left[range(columns_n + 1, nodes, 4)] += 4
+        self.right[range(columns_n + 4, nodes, 4)] -= 4
+
+        # Links the root and the headers of all uncovered columns in a circle, in column order
+        headers = np.append(self.root, np.flatnonzero(self.covered == 0))
+        self.right[headers] = np.roll(headers, -1)
+        self.left[headers] = np.roll(headers, 1)
+
+        # Creates basic up and down pointers, where each node points to itself
+        self.up[:] = np.arange(nodes)
+        self.down[:] = np.arange(nodes)
+
+        # Groups the nodes by column, keeping each column's nodes in the order their rows were added
+        order = np.argsort(row_constraints, kind="stable")
+        column_nodes, node_columns = row_nodes[order], row_constraints[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = node_columns[1:] != node_columns[:-1]
+        last = np.roll(first, -1)
+
+        # Links each node to its neighbours in the column, and the first and last nodes to the column's header
+        self.down[column_nodes] = np.where(last, node_columns, np.roll(column_nodes, -1))
+        self.up[column_nodes] = np.where(first, node_columns, np.roll(column_nodes, 1))
+        self.down[node_columns[first]] = column_nodes[first]
+        self.up[node_columns[last]] = column_nodes[last]
+
+    @staticmethod
+    def get_constraints(row: int, col: int, n: int, box: int = 3) -> tuple[int, int, int, int]:
+        """Gets the constraints for a given row, column and number in a sudoku grid with the given box size.
+        Numpy arrays of rows, columns and numbers can be given to get many constraints at once."""
+        # Stores the grid dimensions, multiplied row and adjusted n to speed up constraint creation
+        side = box * box
+        cells = side * side
+        multiplied_row = row * side
         adjusted_n = n - 1
 
         # Creates the 4 constraint indexes 
         constraint_0 = multiplied_row + col
-        constraint_1 = 81 + multiplied_row + adjusted_n
-        constraint_2 = 162 + col * 9 + adjusted_n
-        constraint_3 = 243 + (col // 3 + 3 * (row // 3)) * 9 + adjusted_n
+        constraint_1 = cells + multiplied_row + adjusted_n
+        constraint_2 = 2 * cells + col * side + adjusted_n
+        constraint_3 = 3 * cells + (col // box + box * (row // box)) * side + adjusted_n
 
         # Returns the indexes as a tuple
         return (constraint_0, constraint_1, constraint_2, constraint_3)
 
-    def add_row(self, index: int, row: int, col: int, n: int, last_nodes: np.ndarray):
-        """Adds new nodes to the constraints table for a given sudoku action."""
-        # Gets constraints for the action
-        constraints = self.get_constraints(row, col, n)
-
-        # Checks if the constraint has already been satisfied and if so returns
-        for i in range(4):
-            if self.covered[constraints[i]]:
-                return index
-
-        # Loops through each constraint and adds a new node to them
-        for i, constraint in enumerate(constraints):
-            node = index + i
-            self.link_below(last_nodes[constraint], node)
-            last_nodes[constraint] = node
-            self.sizes[constraint] += 1
-            self.columns[node] = constraint
-            self.actions[node] = (row, col, n)
-
-        return index + 4
-
-    def link_below(self, node: int, link: int) -> None:
-        """Links one node below another."""
-        self.down[node] = link
-        self.up[link] = node
-
     def cover(self, column: int) -> None:
         """Removes a column and all of its rows from the table."""
         # If a column has already been covered, it shouldn't be covered again
         if self.covered[column]:
             return
 
-        # Marks a column as covered
+        # Marks a column as covered and removes its header from the list of uncovered columns
         self.covered[column] = 1
+        self.right[self.left[column]] = self.right[column]
+        self.left[self.right[column]] = self.left[column]
 
         # Loops through all of the column's rows
         i = column
@@ -120,8 +209,10 @@ class SudokuConstraints:
         if not self.covered[column]:
             return
 
-        # Marks a column as not covered
+        # Marks a column as not covered and restores its header to the list of uncovered columns
         self.covered[column] = 0
+        self.right[self.left[column]] = column
+        self.left[self.right[column]] = column
 
         # Loops through all of the column's rows in reverse to relink them correctly
         i = column
@@ -132,112 +223,218 @@ class SudokuConstraints:
                 self.down[self.up[j]] = j
                 self.up[self.down[j]] = j        
 
-    def solve(self, solution: list[int]) -> bool:
-        """Implements Donald Knuth's 'Algorithm X' for solving the exact cover problem,
-        using the dancing links method to find a solution which satisfies all of the constraints.
-
-        Args:
-            solution (list[int]): a list passed by reference, in which the action
-            to reach a solution will be stored if one is found.
-
-        Returns:
-            bool: whether a solution was found.
+    def cover_row(self, row: int) -> None:
+        """Removes all of the columns in a row from the table."""
+        self.cover(self.columns[row])
+        node = row
+        while (node := self.right[node]) != row:
+            self.cover(self.columns[node])
+
+    def uncover_row(self, row: int) -> None:
+        """Recovers all of the columns in a row, in the reverse order to which they were removed."""
+        node = row
+        while (node := self.left[node]) != row:
+            self.uncover(self.columns[node])
+        self.uncover(self.columns[row])
+
+    def assume(self, row: int, col: int, n: int) -> None:
+        """Assumes that a sudoku action is part of the solution by covering all of the columns
+        in its row, which has the same effect on the table as giving it as a clue.
+
+        Raises:
+            ValueError: if the action isn't in the table or conflicts with a covered constraint.
         """
-        # If all constraints have been covered, a solution has been found
-        if self.covered.all():
-            return True
+        action = (row * self.side + col) * self.side + n - 1
+        node = self.action_rows[action]
+        if node < 0 or any(self.covered[constraint] for constraint in self.action_constraints[action]):
+            raise ValueError(f"the number {n} can't be placed at row {row}, column {col}")
 
-        # The next best column is one which hasn't yet been covered, and has the smallest size
-        row = column = np.argmin(np.where(self.covered, self.max_size, self.sizes))
-        
-        # Covers the column to remove it from the table
-        self.cover(column)
+        self.cover_row(node)
+        self.assumptions.append(node)
 
-        # Keeps track of whether a solution has been found yet
-        solution_found = False
+    def retract(self, row: int, col: int, n: int) -> None:
+        """Retracts a previous assumption, recovering the columns in its row.
 
-        # Goes through each row in the column nondeterministically
-        while (node := (row := self.down[row])) != column:
-            # Covers all columns in the row
-            while (node := self.right[node]) != row:
-                self.cover(self.columns[node])
-
-            # Recursively calls solve using the adjusted table
-            if self.solve(solution):
-                # If a solution was found, adds the action for the row to the solution
-                solution.append(self.actions[row])
-                solution_found = True
-
-            # Reverts changes by uncovering all columns in the row
-            while (node := self.left[node]) != row:
-                self.uncover(self.columns[node])
-
-            # No need to continue checking rows if a solution has been found
-            if solution_found:
-                break
-        
-        # Uncovers the column to restore the original state, and returns whether a solution was found
-        self.uncover(column)
-        return solution_found
+        Retracting the most recent assumption only uncovers its own row, while older
+        assumptions require the more recent ones to be unwound and then reapplied,
+        since the dancing links must be restored in the reverse order to which they were removed.
+
+        Raises:
+            ValueError: if the action hasn't been assumed.
+        """
+        node = self.action_rows[(row * self.side + col) * self.side + n - 1]
+        if node < 0 or node not in self.assumptions:
+            raise ValueError(f"the number {n} at row {row}, column {col} hasn't been assumed")
+
+        # Unwinds the assumptions back to and including the retracted one
+        index = len(self.assumptions) - 1 - self.assumptions[::-1].index(node)
+        for assumption in reversed(self.assumptions[index:]):
+            self.uncover_row(assumption)
+
+        # Reapplies the assumptions which were made after the retracted one
+        reapplied = self.assumptions[index + 1:]
+        del self.assumptions[index:]
+        for assumption in reapplied:
+            self.cover_row(assumption)
+            self.assumptions.append(assumption)
+
+    def choose_column(self) -> int:
+        """Chooses the next column to branch on, which is the uncovered column with the smallest size.
+
+        Every column is compared at once, since reading the headers one at a time
+        from numpy arrays costs more than a single vectorised argmin.
+        """
+        return int(np.where(self.covered, self.max_size + 1, self.sizes).argmin())
 
-    def solve_randomly(self, solution: list[int]) -> bool:
+    def search(self, limit: int = -1, solution: list[tuple] | None = None,
+               rng: np.random.Generator | None = None) -> int:
         """Implements Donald Knuth's 'Algorithm X' for solving the exact cover problem,
-        using the dancing links method to find a random solution which satisfies all of the constraints.
+        using the dancing links method to find solutions which satisfy all of the constraints.
+
+        The search is iterative, keeping an explicit stack of the column chosen at each depth
+        along with the row currently being tried in it, so that its depth isn't limited by
+        Python's recursion limit. The table is always restored to its original state on return.
 
         Args:
-            solution (list[int]): a list passed by reference, in which the action
-            to reach a solution will be stored if one is found.
+            limit (int): an integer defining the limit for how many solutions to find before returning.
+            solution (list[tuple] | None): a list passed by reference, in which the actions
+            to reach the first solution will be stored if one is found.
+            rng (np.random.Generator | None): a random number generator used to try the rows
+            of each column in a random order. If not given, rows are tried in a fixed order.
 
         Returns:
-            bool: whether a solution was found.
+            int: the amount of solutions that were found.
         """
-        # If all constraints have been covered, a solution has been found
-        if self.covered.all():
-            return True
+        # If all constraints have already been covered, the empty set of actions is the only solution
+        if self.right[self.root] == self.root:
+            return 1
 
-        # The next best column is one which hasn't yet been covered, and has the smallest size
-        row = column = np.argmin(np.where(self.covered, self.max_size, self.sizes))
-        
-        # Covers the column to remove it from the table
-        self.cover(column)
+        # Stores frequently used attributes locally to speed up the search
+        root, right, left, down = self.root, self.right, self.left, self.down
+        columns, cover, uncover = self.columns, self.cover, self.uncover
+        solutions_found = 0
+
+        # Counts cover and uncover calls through wrappers only when statistics are wanted,
+        # so that the search itself is unchanged otherwise
+        stats = self.stats
+        if stats is not None:
+            def cover(column: int, cover=cover) -> None:
+                stats.covers += 1
+                cover(column)
+
+            def uncover(column: int, uncover=uncover) -> None:
+                stats.uncovers += 1
+                uncover(column)
+
+        # Counters for the rows tried, the dead ends reached and the deepest level reached
+        nodes = backtracks = 0
+        max_depth = 1
+
+        # Stacks holding the column chosen at each depth, the row being tried in it,
+        # and the rows left to try in a random order if a random number generator is given
+        chosen_columns = [column := self.choose_column()]
+        chosen_rows = [column]
+        remaining_rows = [self.shuffled_rows(column, rng)] if rng is not None else None
+        cover(column)
+
+        while chosen_columns:
+            column, row = chosen_columns[-1], chosen_rows[-1]
+
+            # Reverts the changes made by the last row tried in this column by uncovering all of its columns
+            if row != column:
+                node = row
+                while (node := left[node]) != row:
+                    uncover(columns[node])
+
+            # Moves on to the next row in the column, unless the limit has been reached
+            if limit > 0 and solutions_found >= limit:
+                row = column
+            elif rng is not None:
+                row = remaining_rows[-1].pop() if remaining_rows[-1] else column
+            else:
+                row = down[row]
+
+            # Once every row has been tried, uncovers the column and backtracks to the previous depth
+            if row == column:
+                # A column which had no rows to try is a dead end
+                if chosen_rows[-1] == column:
+                    backtracks += 1
+                uncover(column)
+                chosen_columns.pop()
+                chosen_rows.pop()
+                if rng is not None:
+                    remaining_rows.pop()
+                continue
+
+            # Covers all columns in the row
+            nodes += 1
+            chosen_rows[-1] = row
+            node = row
+            while (node := right[node]) != row:
+                cover(columns[node])
+
+            # If all constraints have been covered, a solution has been found
+            if right[root] == root:
+                solutions_found += 1
+
+                # Stores the actions for the rows of the first solution found
+                if solution is not None and solutions_found == 1:
+                    solution.extend(self.action_tuples[self.actions[row]] for row in chosen_rows)
+                continue
+
+            # Otherwise, the next best column is covered and searched at the next depth
+            chosen_columns.append(column := self.choose_column())
+            chosen_rows.append(column)
+            if rng is not None:
+                remaining_rows.append(self.shuffled_rows(column, rng))
+            cover(column)
+            if len(chosen_columns) > max_depth:
+                max_depth = len(chosen_columns)
+
+        if stats is not None:
+            stats.nodes += nodes
+            stats.backtracks += backtracks
+            stats.max_depth = max(stats.max_depth, max_depth)
 
-        # Keeps track of whether a solution has been found yet
-        solution_found = False
+        return solutions_found
 
-        # Creates a list containing all of the rows in a random order
+    def shuffled_rows(self, column: int, rng: np.random.Generator) -> list[int]:
+        """Creates a list containing all of the rows in a column in a random order."""
         rows = []
+        row = column
         while (row := self.down[row]) != column:
             rows.append(row)
-        np.random.shuffle(rows)
+        rng.shuffle(rows)
+        return rows
 
-        # Goes through each row in the column
-        for row in rows:
-            # Covers all columns in the row
-            node = row
-            while (node := self.right[node]) != row:
-                self.cover(self.columns[node])
+    def solve(self, solution: list[tuple]) -> bool:
+        """Finds a solution which satisfies all of the constraints.
 
-            # Recursively calls solve using the adjusted table
-            if self.solve(solution):
-                # If a solution was found, adds the action for the row to the solution
-                solution.append(self.actions[row])
-                solution_found = True
+        Args:
+            solution (list[tuple]): a list passed by reference, in which the actions
+            to reach a solution will be stored if one is found.
+
+        Returns:
+            bool: whether a solution was found.
+        """
+        return self.search(1, solution) == 1
 
-            # Reverts changes by uncovering all columns in the row
-            while (node := self.left[node]) != row:
-                self.uncover(self.columns[node])
+    def solve_randomly(self, solution: list[tuple], rng: np.random.Generator | None = None) -> bool:
+        """Finds a random solution which satisfies all of the constraints.
 
-            # No need to continue checking rows if a solution has been found
-            if solution_found:
-                break
+        Args:
+            solution (list[tuple]): a list passed by reference, in which the actions
+            to reach a solution will be stored if one is found.
+            rng (np.random.Generator | None): the random number generator to use,
+            which is freshly seeded from the operating system if not given.
 
-        # Uncovers the column to restore the original state, and returns whether a solution was found
-        self.uncover(column)
-        return solution_found
+        Returns:
+            bool: whether a solution was found.
+        """
+        return self.search(1, solution, rng or np.random.default_rng()) == 1
 
     def count_solutions(self, limit: int = -1) -> int:
-        """Implements Donald Knuth's 'Algorithm X' for solving the exact cover problem,
-        using the dancing links method to find and count all solutions which satisfy the constraints.
+        """Finds and counts all solutions which satisfy the constraints.
 
         Args:
             limit (int): an integer defining the limit for how many solutions to count before returning.
@@ -245,139 +442,598 @@ class SudokuConstraints:
         Returns:
             int: the amount of solutions that were found.
         """
-        # If all constraints have been covered, a solution has been found
-        if self.covered.all():
-            return 1
+        return self.search(limit)
 
-        # The next best column is one which hasn't yet been covered, and has the smallest size
-        row = column = np.argmin(np.where(self.covered, self.max_size, self.sizes))
-        
-        # Covers the column to remove it from the table
-        self.cover(column)
 
-        # Keeps track of whether a solution has been found yet
-        solutions_found = 0
+@functools.cache
+def action_tables(box: int) -> tuple[np.ndarray, np.ndarray]:
+    """Builds the tables of every possible action for a grid with the given box size, which are
+    only built once for each size. For a grid with a side of s, action i places the number
+    i % s + 1 in the cell at row i // s^2 and column i // s % s.
 
-        # Goes through each row in the column nondeterministically
-        while (node := (row := self.down[row])) != column:
-            # Covers all columns in the row
-            while (node := self.right[node]) != row:
-                self.cover(self.columns[node])
+    Returns:
+        tuple[np.ndarray, np.ndarray]: an array of each action as a tuple of its row, column
+        and number, and an array of the 4 constraints satisfied by each action.
+    """
+    side = box * box
+    actions = np.arange(side ** 3)
+    rows, cols, ns = actions // (side * side), actions // side % side, actions % side + 1
 
-            # Recursively counts the solutions using the adjusted table
-            solutions_found += self.count_solutions(limit)
+    action_tuples = np.empty(len(actions), dtype=object)
+    action_tuples[:] = list(zip(rows.tolist(), cols.tolist(), ns.tolist()))
+    action_constraints = np.stack(SudokuConstraints.get_constraints(rows, cols, ns, box), axis=1)
+    return action_tuples, action_constraints
 
-            # Reverts changes by uncovering all columns in the row
-            while (node := self.left[node]) != row:
-                self.uncover(self.columns[node])
+class ListSudokuConstraints(SudokuConstraints):
+    """A version of the constraints table which stores its links in Python lists rather than numpy arrays.
 
-            # Checks if the solutions found exceeds the limit
-            if limit > 0 and solutions_found >= limit:
-                # If so, restricts solutions found counter to equal the limit and exits the loop
-                solutions_found = limit
-                break
-        
-        # Uncovers the column to restore the original state, and returns the number of solutions found
-        self.uncover(column)
-        return solutions_found
+    The dancing links search reads and writes single elements at a time, which is much faster
+    on a list than on a numpy array, since numpy has to box every element it returns as a scalar.
+    """
+
+    def __init__(self, sudoku: np.ndarray) -> None:
+        """Constructs a new table of constraints to solve a given sudoku.""" 
+        super().__init__(sudoku)
+
+        # Converts the completed table into lists of native Python integers
+        self.sizes = self.sizes.tolist()
+        self.covered = self.covered.tolist()
+        self.columns = self.columns.tolist()
+        self.actions = self.actions.tolist()
+        self.up = self.up.tolist()
+        self.down = self.down.tolist()
+        self.left = self.left.tolist()
+        self.right = self.right.tolist()
+        self.action_rows = self.action_rows.tolist()
+
+        # Drops the packed buffer, since the links are now held in the lists
+        del self.links
+
+    def choose_column(self) -> int:
+        """Chooses the next column to branch on, which is the uncovered column with the smallest size.
+
+        Only the headers of uncovered columns are visited, and the search stops early at
+        a column with no rows, since no other column can be a better choice.
+        """
+        root, right, sizes = self.root, self.right, self.sizes
+        best_column, best_size = root, self.max_size + 1
+        column = root
+        while (column := right[column]) != root:
+            if (size := sizes[column]) < best_size:
+                best_column, best_size = column, size
+                if size == 0:
+                    break
+        return best_column
 
 class SudokuSolver:
     """A class that provides static methods for finding and counting solutions to sudoku puzzles."""
 
+    # The available implementations of the constraints table, selectable by name
+    ENGINES = {
+        "dlx": SudokuConstraints,
+        "dlx-list": ListSudokuConstraints,
+        "bitmask": SudokuCandidates,
+    }
+
+    # An optional cache of recent solutions, which is consulted before solving 9x9 sudokus
+    cache: SolutionCache | None = None
+
+    # The engines which take longer to solve a sudoku than the cache takes to look one up, which are
+    # the only engines that use the cache, since the bitmask engine usually solves in under 0.3ms
+    CACHED_ENGINES = ("dlx", "dlx-list")
+
+    @staticmethod
+    def set_cache(maxsize: int) -> None:
+        """Enables a cache holding the solutions of up to maxsize recently solved sudokus,
+        which is shared by every equivalent sudoku. A maxsize of 0 disables the cache."""
+        SudokuSolver.cache = SolutionCache(maxsize) if maxsize > 0 else None
+
+    # An optional persistent store of solutions and solution counts, which is consulted before solving or counting
+    store: SolutionStore | None = None
+
+    @staticmethod
+    def set_store(path: str | None, close: bool = True) -> None:
+        """Opens the solution store at the given path, creating it if needed, for use by
+        every later solve and count. A path of None closes and disables the store.
+
+        A process started by forking inherits its parent's connection to the store, which SQLite
+        doesn't allow to be used in the child, even to close it. Such a process must pass close
+        as False, so that the inherited connection is kept open and unused for the life of the
+        process, since even dropping the last reference to it would close it.
+        """
+        if SudokuSolver.store is not None:
+            if close:
+                SudokuSolver.store.close()
+            else:
+                _inherited_stores.append(SudokuSolver.store)
+        SudokuSolver.store = SolutionStore(path) if path is not None else None
+
     def __call__(self, sudoku: np.ndarray) -> np.ndarray:
         return self.solve(sudoku)
     
     @staticmethod
-    def solve(sudoku: np.ndarray) -> np.ndarray:
+    def get_engine(engine: str) -> type[SudokuConstraints | SudokuCandidates]:
+        """Gets the constraints table class for a given engine name."""
+        if engine not in SudokuSolver.ENGINES:
+            raise ValueError(f"unknown solving engine '{engine}', expected one of {', '.join(SudokuSolver.ENGINES)}")
+        return SudokuSolver.ENGINES[engine]
+
+    @staticmethod
+    def solve(sudoku: np.ndarray, engine: str = "dlx", rng: np.random.Generator | None = None,
+              stats: SearchStats | None = None) -> np.ndarray:
         """Solves a given sudoku puzzle and returns its solution.
 
         Args:
-            sudoku (np.ndarray): 9x9 numpy array representing the sudoku grid.
-            Empty cells are stored as 0.
+            sudoku (np.ndarray): square numpy array representing the sudoku grid,
+            which is 9x9 for a standard sudoku. Empty cells are stored as 0.
+            engine (str): the name of the solving engine to use from ENGINES.
+            rng (np.random.Generator | None): the random number generator used to choose
+            between solutions if there are many, which is freshly seeded if not given.
+            stats (SearchStats | None): statistics passed by reference, to which the work done
+            by the search is added. Nothing is added if the solution is found in the cache or store.
 
         Returns:
-            np.ndarray: 9x9 numpy array containing the solution if one was found. 
+            np.ndarray: numpy array of the same shape containing the solution if one was found.
             If there is no solution, all array entries are -1.
         """
+        # Uses the stored solution of the sudoku if there is one
+        if SudokuSolver.store is not None:
+            sudoku_string = SudokuSolver.to_string(sudoku)
+            stored = SudokuSolver.store.get(sudoku_string)
+            if stored is not None and stored[0] is not None:
+                sudoku[:] = SudokuSolver.from_string(stored[0])
+                return sudoku
+            if stored is not None and stored[1] == 0:
+                sudoku[:] = -1
+                return sudoku
+
+        # Uses the cached solution of an equivalent sudoku if there is one, which is only possible for 9x9 sudokus
+        # and only worthwhile for engines that are slower than a lookup
+        cache = SudokuSolver.cache if sudoku.shape == (9, 9) and engine in SudokuSolver.CACHED_ENGINES else None
+        if cache is not None:
+            form, cached_solution = cache.lookup(sudoku)
+            if cached_solution is not None:
+                sudoku[:] = cached_solution
+                return sudoku
 
         # Creates the constraints for the sudoku puzzle
-        constraints = SudokuConstraints(sudoku)
+        build_start = time.perf_counter()
+        constraints = SudokuSolver.get_engine(engine)(sudoku)
+        constraints.stats = stats
         
         # Attempts to find a solution that satisfies the constraints
+        search_start = time.perf_counter()
         solution_actions = []
-        if constraints.solve_randomly(solution_actions):
+        found = constraints.solve_randomly(solution_actions, rng)
+
+        if stats is not None:
+            stats.build_time += search_start - build_start
+            stats.search_time += time.perf_counter() - search_start
+
+        if found:
             # If a solution was found, the actions are carried out to complete the sudoku
             for row, col, n in solution_actions:
                 sudoku[row, col] = n
         else:
             # Otherwise, if no solution was found, the grid is filled with -1
             sudoku[:] = -1
+
+        if cache is not None:
+            cache.store(form, sudoku)
+
+        if SudokuSolver.store is not None:
+            if (sudoku < 0).any():
+                SudokuSolver.store.put(sudoku_string, count=0)
+            else:
+                SudokuSolver.store.put(sudoku_string, SudokuSolver.to_string(sudoku))
         
         return sudoku
     
     @staticmethod
-    def count_solutions(sudoku: np.ndarray, limit: int = -1) -> int:
+    def count_solutions(sudoku: np.ndarray, limit: int = -1, engine: str = "dlx",
+                        stats: SearchStats | None = None) -> int:
         """Counts the number of solutions to a given sudoku puzzle.
         
         Args:
-            sudoku (np.ndarray): 9x9 numpy array representing the sudoku grid.
-            Empty cells are stored as 0.
+            sudoku (np.ndarray): square numpy array representing the sudoku grid,
+            which is 9x9 for a standard sudoku. Empty cells are stored as 0.
             limit (int): an integer defining the limit for how many solutions to count before returning.
+            engine (str): the name of the solving engine to use from ENGINES.
+            stats (SearchStats | None): statistics passed by reference, to which the work done
+            by the search is added. Nothing is added if the count is found in the store.
 
         Returns:
             int: the amount of solutions that were found.
         """
-        return SudokuConstraints(sudoku).count_solutions(limit)
-    
-if __name__ == '__main__':
-    argv = sys.argv[1:]
-    
-    # Ensures command line argument for the sudoku puzzle to be solved is specified
-    if len(argv) == 0:
-        print(f"You must specify a sudoku puzzle to be solved as a command line argument.")
-        exit()
+        # Uses the stored count if it's enough to answer for this limit, which it is unless the sudoku
+        # has at least 2 solutions and more than 2 were asked for
+        if SudokuSolver.store is not None:
+            sudoku_string = SudokuSolver.to_string(sudoku)
+            stored = SudokuSolver.store.get(sudoku_string)
+            if stored is not None and stored[1] is not None and (stored[1] < 2 or 0 < limit <= 2):
+                return min(stored[1], limit) if limit > 0 else stored[1]
 
-    # Ensures the correct amount of command line arguments are specified
-    if len(argv) > 2:
-        print("There should be at most 2 command line arguments specified.")
-        exit()
+        build_start = time.perf_counter()
+        constraints = SudokuSolver.get_engine(engine)(sudoku)
+        constraints.stats = stats
 
-    # Gets the sudoku string from command line arguments
-    sudoku_string = argv[0].replace('.', '0')
+        search_start = time.perf_counter()
+        count = constraints.count_solutions(limit)
 
-    # Ensures sudoku string is of the correct format
-    if len(sudoku_string) != 81 or not sudoku_string.isnumeric():
-        print("The sudoku puzzle must be represented as a string of 81 digits from 0-9.")
-        exit()
+        if stats is not None:
+            stats.build_time += search_start - build_start
+            stats.search_time += time.perf_counter() - search_start
+
+        # Stores the count unless the search stopped at one solution, which doesn't show whether there are others
+        if SudokuSolver.store is not None and (limit != 1 or count == 0):
+            SudokuSolver.store.put(sudoku_string, count=count)
+
+        return count
+
+    @staticmethod
+    def analyse(sudoku: np.ndarray, limit: int = 2, engine: str = "dlx",
+                stats: SearchStats | None = None) -> tuple[int, np.ndarray]:
+        """Counts the number of solutions to a given sudoku puzzle and finds one of them in a single search,
+        which is enough to both check that a puzzle has a unique solution and to solve it.
+
+        Args:
+            sudoku (np.ndarray): square numpy array representing the sudoku grid,
+            which is 9x9 for a standard sudoku. Empty cells are stored as 0. It isn't modified.
+            limit (int): an integer defining the limit for how many solutions to count before returning.
+            engine (str): the name of the solving engine to use from ENGINES.
+            stats (SearchStats | None): statistics passed by reference, to which the work done
+            by the search is added. Nothing is added if the result is found in the store.
+
+        Returns:
+            tuple[int, np.ndarray]: the amount of solutions that were found, and a numpy array of the same
+            shape containing the first solution found. If there is no solution, all array entries are -1.
+        """
+        solution = sudoku.copy()
+
+        # Uses the stored count and solution if they're enough to answer for this limit
+        if SudokuSolver.store is not None:
+            sudoku_string = SudokuSolver.to_string(sudoku)
+            stored = SudokuSolver.store.get(sudoku_string)
+            if stored is not None and stored[1] is not None and (stored[1] < 2 or 0 < limit <= 2):
+                count = min(stored[1], limit) if limit > 0 else stored[1]
+                if count == 0:
+                    solution[:] = -1
+                    return count, solution
+                if stored[0] is not None:
+                    solution[:] = SudokuSolver.from_string(stored[0])
+                    return count, solution
+
+        build_start = time.perf_counter()
+        constraints = SudokuSolver.get_engine(engine)(sudoku)
+        constraints.stats = stats
+
+        # Counts the solutions, keeping the actions of the first one found
+        search_start = time.perf_counter()
+        solution_actions = []
+        count = constraints.search(limit, solution_actions)
+
+        if stats is not None:
+            stats.build_time += search_start - build_start
+            stats.search_time += time.perf_counter() - search_start
+
+        if count > 0:
+            for row, col, n in solution_actions:
+                solution[row, col] = n
+        else:
+            solution[:] = -1
+
+        # Stores the solution, and the count unless the search stopped at one solution
+        if SudokuSolver.store is not None:
+            SudokuSolver.store.put(sudoku_string, SudokuSolver.to_string(solution) if count > 0 else None,
+                                   count if limit != 1 or count == 0 else None)
+
+        return count, solution
+
+    @staticmethod
+    def solve_many(puzzles: Iterable[str | np.ndarray],
+                   progress: Callable[[int, float], None] | None = None,
+                   progress_interval: int = 10000, engine: str = "dlx", unique: bool = False,
+                   rng: np.random.Generator | None = None) -> Iterator[np.ndarray]:
+        """Lazily solves a stream of sudoku puzzles, yielding their solutions in order.
+
+        Args:
+            puzzles (Iterable[str | np.ndarray]): sudoku strings or square numpy arrays
+            to be solved. Blank strings are skipped, and arrays are not modified.
+            progress (Callable[[int, float], None] | None): an optional function called
+            with the number of puzzles solved and the seconds elapsed so far.
+            progress_interval (int): how many puzzles to solve between calls to progress.
+            engine (str): the name of the solving engine to use from ENGINES.
+            unique (bool): whether to only give the solutions of puzzles with a unique solution, which
+            also counts the solutions of every puzzle. Other puzzles are given solutions of all -1.
+            rng (np.random.Generator | None): the random number generator used to choose between
+            solutions, which is shared by every puzzle and freshly seeded if not given.
+
+        Yields:
+            np.ndarray: numpy array containing the solution to each puzzle,
+            in the same form as returned by solve.
+        """
+        start_time = time.perf_counter()
+        solved = 0
+
+        # Creates one generator for the whole stream, since seeding one for each puzzle is a noticeable cost
+        if rng is None:
+            rng = np.random.default_rng()
+
+        for puzzle in puzzles:
+            # Parses sudoku strings, skipping blank lines, and copies arrays so the input is unchanged
+            if isinstance(puzzle, str):
+                if not (puzzle := puzzle.strip()):
+                    continue
+                sudoku = SudokuSolver.from_string(puzzle)
+            else:
+                sudoku = np.array(puzzle, dtype=int)
+
+            # Counts the solutions while solving if only unique solutions are wanted
+            if unique:
+                count, solution = SudokuSolver.analyse(sudoku, 2, engine)
+                if count != 1:
+                    solution[:] = -1
+                yield solution
+            else:
+                yield SudokuSolver.solve(sudoku, engine, rng)
+
+            # Periodically reports the number of puzzles solved
+            solved += 1
+            if progress is not None and solved % progress_interval == 0:
+                progress(solved, time.perf_counter() - start_time)
+
+        # Reports the final totals once the stream is exhausted
+        if progress is not None:
+            progress(solved, time.perf_counter() - start_time)
+
+    @staticmethod
+    def solve_parallel(puzzles: Iterable[str | np.ndarray], workers: int | None = None,
+                       chunksize: int = 256,
+                       progress: Callable[[int, float], None] | None = None,
+                       progress_interval: int = 10000, engine: str = "dlx", unique: bool = False) -> Iterator[np.ndarray]:
+        """Solves a stream of sudoku puzzles across a pool of worker processes,
+        yielding their solutions in the same order as the input.
+
+        Args:
+            puzzles (Iterable[str | np.ndarray]): sudoku strings or square numpy arrays
+            to be solved. Blank strings are skipped, and arrays are not modified.
+            workers (int | None): the number of worker processes, which defaults to the CPU count.
+            chunksize (int): how many puzzles are sent to a worker at a time.
+            progress (Callable[[int, float], None] | None): an optional function called
+            with the number of puzzles solved and the seconds elapsed so far.
+            progress_interval (int): roughly how many puzzles to solve between calls to progress.
+            engine (str): the name of the solving engine to use from ENGINES.
+            unique (bool): whether to only give the solutions of puzzles with a unique solution, which
+            also counts the solutions of every puzzle. Other puzzles are given solutions of all -1.
+
+        Yields:
+            np.ndarray: numpy array containing the solution to each puzzle,
+            in the same form as returned by solve.
+        """
+        # Ensures an unknown engine is reported before any workers are started
+        SudokuSolver.get_engine(engine)
+
+        start_time = time.perf_counter()
+        solved = 0
+
+        # Groups the puzzles into chunks so that each task amortises the cost of inter-process communication
+        iterator = iter(puzzles)
+        chunks = iter(lambda: list(itertools.islice(iterator, chunksize)), [])
+
+        # Gives each worker its own cache of the same size as this process's cache, and a connection to the same store
+        cache_size = SudokuSolver.cache.maxsize if SudokuSolver.cache is not None else 0
+        store_path = SudokuSolver.store.path if SudokuSolver.store is not None else None
+
+        with multiprocessing.Pool(workers, _init_worker, (cache_size, store_path)) as pool:
+            # Chunks are distributed to the workers, and imap returns their results in input order
+            for solutions in pool.imap(functools.partial(_solve_chunk, engine=engine, unique=unique), chunks):
+                yield from solutions
+
+                # Reports the number of puzzles solved whenever another interval is passed
+                previous, solved = solved, solved + len(solutions)
+                if progress is not None and solved // progress_interval > previous // progress_interval:
+                    progress(solved, time.perf_counter() - start_time)
+
+        # Reports the final totals once the stream is exhausted
+        if progress is not None:
+            progress(solved, time.perf_counter() - start_time)
+
+    @staticmethod
+    def from_string(sudoku_string: str) -> np.ndarray:
+        """Converts a sudoku string into a square numpy array, with the size of the grid given by the string's length.
+
+        Args:
+            sudoku_string (str): the symbols of every cell read row by row, where empty cells
+            are represented by 0 or '.'. A 9x9 sudoku has 81 digits from 1-9, while larger
+            grids such as 16x16 and 25x25 continue with the letters A-Z for 10 upwards.
+
+        Returns:
+            np.ndarray: square numpy array representing the sudoku grid.
+
+        Raises:
+            ValueError: if the string is not a valid sudoku string.
+        """
+        # Finds the size of the grid, which has a side of box^2 and box^4 cells
+        side = math.isqrt(len(sudoku_string))
+        box = math.isqrt(side)
 
-    # Parses the optional print mode argument
-    print_mode = 0
-    if len(argv) > 1:
-        print_mode = argv[1]
-        if print_mode != '0' and print_mode != '1':
-            print("The second command line argument must be '0' or '1' specifying the output print mode.")
-            exit()
+        # Converts each symbol to its digit, where unknown characters become -1
+        digits = SYMBOL_VALUES[np.frombuffer(sudoku_string.encode("ascii", "replace"), dtype=np.uint8)]
+
+        # Ensures sudoku string is of the correct format
+        if box < 2 or box ** 4 != len(sudoku_string) or digits.min() < 0 or digits.max() > side:
+            raise ValueError("sudoku puzzle must be represented as a string of 81 digits from 0-9, "
+                             "or 256 or 625 symbols using A-Z for 10 upwards")
+
+        return digits.reshape((side, side))
+
+    @staticmethod
+    def to_string(sudoku: np.ndarray) -> str:
+        """Converts a square numpy array into a sudoku string."""
+        return ''.join(SYMBOLS[n] if n >= 0 else str(n) for n in sudoku.reshape(-1).tolist())
+
+def _init_worker(cache_size: int, store_path: str | None) -> None:
+    """Sets up the cache and store of a worker process to match the process that started it,
+    opening its own connection to the store in place of any connection inherited by forking."""
+    SudokuSolver.set_cache(cache_size)
+    SudokuSolver.set_store(store_path, close=False)
+
+def _solve_chunk(puzzles: list[str | np.ndarray], engine: str, unique: bool) -> np.ndarray | list[np.ndarray]:
+    """Solves a chunk of puzzles within a worker process, returning the solutions stacked in one array
+    if they're all the same size, or in a list if the chunk mixes sizes of grid."""
+    # Each puzzle gets a newly built table of constraints, rather than having its clues assumed and then
+    # retracted on one table for the empty grid which the worker keeps. Building from the clues is vectorised,
+    # taking about 0.3ms for a typical 9x9 sudoku with the dlx engine and 0.4ms with dlx-list, while assuming
+    # and retracting the clues one row at a time takes about 5ms and 0.6ms, so rebuilding is faster
+    solutions = list(SudokuSolver.solve_many(puzzles, engine=engine, unique=unique))
+    if len({solution.shape for solution in solutions}) > 1:
+        return solutions
+    return np.stack(solutions) if solutions else np.zeros((0, 9, 9), dtype=int)
+
+def print_grid(sudoku: np.ndarray, file=None) -> None:
+    """Pretty prints a sudoku grid of any size for easy reading, leaving empty cells blank."""
+    side = len(sudoku)
+    box = math.isqrt(side)
+    for y in range(side):
+        # Prints the entire current row
+        for x in range(side):
+            if x % box == 0 and x > 0:
+                print("|", end="", file=file)
+            n = sudoku[y, x]
+            print(SYMBOLS[n] if n > 0 else ' ' if n == 0 else n, end="", file=file)
+
+        # Prints row divider if necessary
+        print("\n" + "+".join(["-" * box] * box) if (y + 1) % box == 0 and y < side - 1 else "", file=file)
+
+def report_progress(solved: int, elapsed: float) -> None:
+    """Reports batch solving progress and throughput to stderr."""
+    rate = solved / elapsed if elapsed > 0 else 0
+    print(f"Solved {solved} puzzles in {elapsed:.2f}s ({rate:.1f} puzzles/s)", file=sys.stderr)
+
+def report_stats(stats: SearchStats) -> None:
+    """Reports the statistics of a search to stderr."""
+    print(f"Nodes: {stats.nodes}, backtracks: {stats.backtracks}, covers: {stats.covers}, "
+          f"uncovers: {stats.uncovers}, max depth: {stats.max_depth}", file=sys.stderr)
+    print(f"Build time: {stats.build_time * 1000:.2f}ms, search time: {stats.search_time * 1000:.2f}ms", file=sys.stderr)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    # Adds command line arguments to be parsed
+    parser.add_argument("sudoku", nargs="?", default=None,
+        help="sudoku string to be solved, of 81 digits or 256 or 625 symbols for larger grids")
+    parser.add_argument("print_mode", nargs="?", type=int, choices=[0, 1], default=0,
+        help="the output print mode, 0 is a sudoku string and 1 is a pretty printed grid")
+    parser.add_argument("-i", "--input", default=None,
+        help="file containing sudoku strings to solve in batch, one per line, or a puzzle bank")
+    parser.add_argument("-o", "--output", default=None,
+        help="file to write batch solutions to, one per line or as a puzzle bank if it ends in .bank (defaults to stdout)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+        help="the number of processes to solve batch puzzles with, 0 uses every CPU")
+    parser.add_argument("-e", "--engine", choices=SudokuSolver.ENGINES, default="dlx",
+        help="the solving engine to use")
+    parser.add_argument("-c", "--cache", type=int, default=0,
+        help="the number of solutions to cache while batch solving, shared between equivalent puzzles")
+    parser.add_argument("--store",
+        help="the path of a file storing solutions between runs, which is created if it doesn't exist")
+    parser.add_argument("--stats", action="store_true",
+        help="report statistics about the search for a single sudoku")
+
+    # Parses the command line arguments
+    args = parser.parse_args()
+    SudokuSolver.set_store(args.store)
+
+    # Batch mode streams puzzles from the input file to the output line by line
+    if args.input is not None:
+        if args.sudoku is not None:
+            parser.error("a sudoku string cannot be specified along with an input file")
+
+        if args.jobs < 0:
+            parser.error("the number of jobs must be at least 0")
+        if args.cache < 0:
+            parser.error("the cache size must be at least 0")
+        SudokuSolver.set_cache(args.cache)
+        if args.cache > 0 and args.engine not in SudokuSolver.CACHED_ENGINES:
+            print(f"Warning: the cache is not used by the {args.engine} engine, which solves faster than a cache lookup",
+                  file=sys.stderr)
+
+        # Reads puzzles directly from a bank's memory map, or otherwise from the lines of a text file
+        input_file = None
+        try:
+            if is_bank(args.input):
+                puzzles = PuzzleBank(args.input).puzzles
+            else:
+                input_file = open(args.input)
+                puzzles = (line for line in input_file if line.strip())
+        except OSError as e:
+            parser.error(str(e))
+
+        # Writes a bank of puzzles and their solutions if the output has the bank extension, which
+        # needs a second copy of the input stream to pair each puzzle with its solution. Banks only
+        # store the solutions of puzzles with a unique solution, so that they can be trusted when played
+        bank_writer = None
+        to_bank = args.output is not None and args.output.endswith(BANK_EXTENSION)
+        if to_bank:
+            puzzles, originals = itertools.tee(puzzles)
+        else:
+            output_file = open(args.output, "w") if args.output else sys.stdout
+
+        # Solves in this process for a single job, otherwise spreads the puzzles over a process pool
+        if args.jobs == 1:
+            solutions = SudokuSolver.solve_many(puzzles, report_progress, engine=args.engine, unique=to_bank)
         else:
-            print_mode = int(print_mode)
+            solutions = SudokuSolver.solve_parallel(puzzles, args.jobs or None,
+                progress=report_progress, engine=args.engine, unique=to_bank)
+
+        try:
+            for solution in solutions:
+                if not to_bank:
+                    output_file.write(SudokuSolver.to_string(solution) + "\n")
+                    continue
+
+                # Creates the bank once the size of the grids is known from the first solution
+                if bank_writer is None:
+                    bank_writer = BankWriter(args.output, len(solution), solutions=True)
+                puzzle = next(originals)
+                bank_writer.write(SudokuSolver.from_string(puzzle.strip()) if isinstance(puzzle, str) else puzzle, solution)
+        except ValueError as e:
+            parser.error(str(e))
+        finally:
+            if input_file is not None:
+                input_file.close()
+            if to_bank:
+                (bank_writer or BankWriter(args.output, solutions=True)).close()
+            else:
+                output_file.flush()
+                if output_file is not sys.stdout:
+                    output_file.close()
+
+        # Reports how often the cache held the solution, which only covers this process's cache
+        if SudokuSolver.cache is not None and args.jobs == 1 and args.engine in SudokuSolver.CACHED_ENGINES:
+            info = SudokuSolver.cache.info()
+            print(f"Cache hits: {info.hits}, misses: {info.misses}", file=sys.stderr)
+        exit()
+
+    # Ensures a sudoku puzzle to be solved is specified
+    if args.sudoku is None:
+        parser.error("you must specify a sudoku puzzle to be solved or an input file")
 
     # Converts string input to a numpy array containing the sudoku
-    sudoku = np.array(list(sudoku_string), dtype=int).reshape((9, 9))
+    try:
+        sudoku = SudokuSolver.from_string(args.sudoku)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Solves the given sudoku, reporting the statistics of the search if they're wanted
+    stats = SearchStats() if args.stats else None
+    solution = SudokuSolver.solve(sudoku, args.engine, stats=stats)
+    if stats is not None:
+        report_stats(stats)
 
-    # Solves the given sudoku
-    solution = SudokuSolver.solve(sudoku)
-    
     # Outputs solution in a string format if print mode is 0
-    if print_mode == 0:
-        print(''.join(map(str, solution.reshape(-1))))
+    if args.print_mode == 0:
+        print(SudokuSolver.to_string(solution))
         exit()
 
     # Pretty prints the solution for easy reading if print mode is 1
-    for y in range(9):
-        # Prints the entire current row
-        for x in range(9):
-            if x % 3 == 0 and x > 0:
-                print("|", end="")
-            print(f"{solution[y, x]}", end="")
-        
-        # Prints row divider if necessary
-        print("\n---+---+---" if (y + 1) % 3 == 0 and y < 8 else "")
+    print_grid(solution)
@@ -0,0 +1,71 @@
+"""Stores sudoku solutions and solution counts in an SQLite file that persists between runs."""
+
+import os
+import sqlite3
+
+# Seconds to wait for another process to finish writing before giving up
+BUSY_TIMEOUT = 30
+
+class SolutionStore:
+    """A class that stores the solution and uniqueness of sudokus on disk, keyed by their sudoku strings.
+
+    The store is an SQLite database in write-ahead logging mode, which lets any number of
+    processes read from it while another writes. Each process opens its own connection, so a
+    store can be shared by the workers of a process pool by passing them its path.
+
+    Each sudoku has its own row holding its solution, if one has been found, and its number of
+    solutions counted up to a limit of 2, which is enough to tell whether it is unique.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        """Opens the store at the given path, creating it if it doesn't exist."""
+        self.path = os.fspath(path)
+        self.connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+
+        # Lets readers continue while another process is writing, and only syncs to disk at checkpoints
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS sudokus (sudoku TEXT PRIMARY KEY, solution TEXT, count INTEGER)"
+            " WITHOUT ROWID"
+        )
+
+    def get(self, sudoku_string: str) -> tuple[str | None, int | None] | None:
+        """Gets what is known about a sudoku.
+
+        Args:
+            sudoku_string (str): the sudoku string of the puzzle, with empty cells as 0.
+
+        Returns:
+            tuple[str | None, int | None] | None: the sudoku string of its solution, or None if it
+            has no solution or none has been stored, and its number of solutions up to 2, or None
+            if they haven't been counted. Returns None if nothing is stored for the sudoku.
+        """
+        return self.connection.execute(
+            "SELECT solution, count FROM sudokus WHERE sudoku = ?", (sudoku_string,)
+        ).fetchone()
+
+    def put(self, sudoku_string: str, solution: str | None = None, count: int | None = None) -> None:
+        """Stores the solution or number of solutions of a sudoku, keeping anything
+        already stored for it that isn't given.
+
+        Args:
+            sudoku_string (str): the sudoku string of the puzzle, with empty cells as 0.
+            solution (str | None): the sudoku string of its solution, if one was found.
+            count (int | None): its number of solutions, which is stored up to a limit of 2.
+        """
+        if count is not None:
+            count = min(count, 2)
+
+        self.connection.execute(
+            "INSERT INTO sudokus VALUES (?, ?, ?) ON CONFLICT (sudoku) DO UPDATE SET"
+            " solution = coalesce(excluded.solution, solution), count = coalesce(excluded.count, count)",
+            (sudoku_string, solution, count),
+        )
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT count(*) FROM sudokus").fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the connection to the store."""
+        self.connection.close()